@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Where cached analysis reports are kept and how much disk they may use
+DEFAULT_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", os.path.join("cache", "analysis"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("ANALYSIS_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+
+def make_cache_key(audio_bytes, prompt, model_name):
+    # Length-prefix every part so different splits can never hash the same
+    digest = hashlib.sha256()
+    for part in (model_name.encode("utf-8"), prompt.encode("utf-8"), bytes(audio_bytes)):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Persistent, size-bounded LRU cache of analysis reports keyed by content hash."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> size in bytes, ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._size = 0
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        # Rebuild recency order from file mtimes (touched on every hit)
+        found = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith(".json"):
+                        continue
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+    def get(self, key):
+        entry = self.get_any([key])[1]
+        return entry.get("text") if entry else None
+
+    def get_any(self, keys):
+        # First of several candidate keys that is cached, as (key, entry), or
+        # (None, None). entry is the stored dict (text, model, recording_id).
+        # Counts as one lookup, whatever the number of keys.
+        with self._lock:
+            for key in keys:
+                entry = self._read(key)
+                if entry is not None:
+                    self.hits += 1
+                    return key, entry
+            self.misses += 1
+            return None, None
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            # Missing, or removed/corrupted by another process
+            self._forget(key)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, text, model_name=None, recording_id=None):
+        # recording_id is the fingerprint index entry of the recording, if any
+        path = self._path(key)
+        payload = json.dumps({
+            "model": model_name,
+            "recording_id": recording_id,
+            "created_at": time.time(),
+            "text": text,
+        }, ensure_ascii=False).encode("utf-8")
+
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write atomically so concurrent readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            self._forget(key)
+            self._entries[key] = len(payload)
+            self._size += len(payload)
+            self._evict()
+
+    def _forget(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    # One cache per process; Streamlit re-executes the main script on every
+    # rerun, so the shared instance (and its counters) must live here
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AnalysisCache()
+        return _default_cache
@@ -0,0 +1,785 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from analysis_cache import get_analysis_cache, make_cache_key
+from audio_preprocess import normalize_audio
+from backends import create_backend
+from fingerprint import compute_fingerprint, get_fingerprint_index
+from model_router import (
+    MODEL_ROUTING, candidate_models, choose_model, escalate, estimate_duration, log_decision, missing_sections,
+)
+from report_schema import JSON_OUTPUT_INSTRUCTIONS, RESPONSE_SCHEMA, ReportValidationError, validate_report
+from resilience import with_resilience
+from segmented_analysis import analyze_segmented
+import telemetry
+
+
+logger = logging.getLogger(__name__)
+
+# Transcode/downmix/trim uploads before sending them (needs ffmpeg on PATH)
+PREPROCESS_AUDIO = os.getenv("AUDIO_PREPROCESS", "1") != "0"
+# Split long calls into parallel segments and merge the partial reports
+SEGMENTED_ANALYSIS = os.getenv("SEGMENTED_ANALYSIS", "0") == "1"
+# "markdown" (default) or "json" for schema-validated structured reports
+ANALYSIS_OUTPUT = os.getenv("ANALYSIS_OUTPUT", "markdown").lower()
+# Reuse the report of an earlier recording of the same call, matched by an
+# audio fingerprint (needs ffmpeg and numpy)
+DEDUPE_AUDIO = os.getenv("AUDIO_DEDUPE", "1") != "0"
+
+# Model used for audio analysis when model routing is off (MODEL_ROUTING=0);
+# otherwise model_router picks flash or pro per call
+MODEL_NAME = "gemini-2.5-flash"
+# MODEL_NAME = "gemini-2.5-pro"
+# MODEL_NAME = "gemini-3-flash"
+
+# Combined prompt for direct audio analysis
+ANALYSIS_PROMPT = """
+CONFIGURATION
+
+Manufacturer/Company: Naga
+Sales Representative: Naga Foods salesperson
+
+------------------------------------------------------------
+
+CRITICAL INSTRUCTION - Brand Identification
+
+1. Naga's OWN Products
+- "Naga brand"
+- "Our product" / "Our company's product"
+- "Naga Foods product"
+- If no brand is mentioned, assume it's Naga's
+- Do not repeat products if already mentioned
+
+2. Competitor Brands – ALL other brand names mentioned, including:
+- Nandi, Sankar, Shakti, Aachi, MTR, Britannia, etc.
+
+3. Online Retailers – Any online platforms mentioned (e.g., Amazon, Flipkart, BigBasket, etc.)
+
+IMPORTANT: DO NOT assume a product is Naga's unless explicitly stated!
+
+------------------------------------------------------------
+
+SPEAKER CONTEXT RULES (CRITICAL)
+ 
+Before mapping brands and products, determine who is speaking:
+ 
+- If the **Sales Representative** mentions a product, assume it is **Naga’s product** unless they clearly say it’s a competitor.
+- If the **Customer (store owner)** mentions a product or brand name, assume it is a **competitor brand**, unless the Sales Rep later confirms it belongs to Naga.
+- If both speakers mention the same product name, assign ownership based on context and tone:
+  - If Sales Rep is promoting or explaining → Naga’s product.
+  - If Customer is comparing or complaining → Competitor product.
+- When uncertain, label it as **“Ambiguous – Needs context”** and do not count it in Naga product analysis.
+------------------------------------------------------------
+
+Brand & Product Mapping (Complete this FIRST)
+
+Before analysis, categorize ALL brands and products mentioned in the conversation:
+
+A. Naga Brand Products
+- [List of Products from Manufacturer, Schemes are not discussed]
+- [List of Products from Manufacturer, where schemes are discussed]
+
+B. Competitor Brands Mentioned
+- [List EACH competitor brand separately with details]
+
+------------------------------------------------------------
+
+Comprehensive Sales Analysis
+
+Listen to this tamil audio conversation and provide analysis without transcribing first.
+
+IMPORTANT: Start directly with the analysis content. Do not include introductory phrases.
+
+------------------------------------------------------------
+
+1. Conversation Summary
+    - give a brief summary of the conversation (3-5 sentences)
+
+------------------------------------------------------------
+
+2. Sales Matrix
+
+Naga Products Performance
+- Naga products promoted: Which Naga products were pitched? Customer response?
+- Volume pushed / upselling: Bulk orders or larger pack sizes attempted? Quantities?
+- Schemes offered: Naga schemes, discounts, free-piece offers mentioned?
+    [Give details of all the schemes mentioned with specifics like which product is offered with which scheme, discount %, which item is free for which scheme, etc.]
+- Cross-selling within Naga portfolio: Were multiple Naga products bundled?
+    [Give details of any cross-selling efforts]
+- Acceptance/Rejection: Which Naga products did customer accept or reject?
+
+Sales Barriers
+- Objections raised: What prevented Naga sales?
+- Competitor advantages cited: What specific advantages did competitors have?
+
+------------------------------------------------------------
+3. Customer Buying Patterns
+
+A. Regularly buying products (Customer commits to buy BEFORE schemes are explained OR shows clear intent to buy regardless of schemes)
+    - [List products where customer showed immediate interest or agreed to buy before any schemes/offers were mentioned]
+    - [Also include products where customer clearly intended to buy but scheme was mentioned first - analyze if the purchase decision was truly influenced by the scheme or not]
+    - [Note: These are products customer buys based on regular demand/habit/necessity]
+
+B. Scheme Based Orders (Customer commits to buy ONLY BECAUSE schemes influenced their decision)
+    - [List products where customer showed hesitation, said no initially, or was undecided BUT changed their mind specifically because of the scheme/offer]
+    - [Include products where customer increased quantity due to schemes]
+    - [Note: These purchases were clearly driven by the schemes/offers - customer behavior changed due to the incentive]
+
+CRITICAL ANALYSIS REQUIRED - Look for these indicators:
+
+**For Regular Buying:**
+- Customer asks for the product immediately without hearing schemes
+- Customer says "I need this" or "Give me [quantity]" before schemes are mentioned
+- Customer shows clear intent to purchase regardless of offers
+- Customer maintains same quantity even after hearing schemes
+
+**For Scheme-Based Buying:**
+- Customer initially hesitates or says "Let me think" but changes mind after scheme
+- Customer says "No" first but then says "Okay" after hearing the offer
+- Customer increases quantity specifically for the scheme (e.g., "Then give me 10kg instead of 5kg")
+- Customer explicitly mentions the scheme as reason for buying (e.g., "Because of the free piece, I'll take it")
+- Customer compares and decides based on the offer value
+
+**IMPORTANT:** If customer was already planning to buy and scheme was just mentioned coincidentally, categorize as REGULAR buying, not scheme-based.
+------------------------------------------------------------
+
+4. Competitive Intelligence & Customer Psychology
+
+A. Competitor Brand Analysis
+For EACH competitor brand mentioned, document separately:
+
+**Brand 1:**
+- Brand Name: [e.g., Shakti, Nandi, etc.]
+- Products: Which product categories?
+- Customer's Current Status: Does customer stock it? How much?
+- Reasons for Preference: Why does customer prefer this brand than Naga in detail?
+    - [Price? Consumers Choice? Taste? Local brand? Habit? Promotions? etc..]
+- Category:
+    - [Based on the reason Categorize whether it is due to Price Concern or Discount Concern or Product Variety or Product Package Size or Other factors]
+      IMPORTANT - Choose the Category only on the list of reasons mentioned above, dont change the list.
+
+**Brand 2:**
+- Brand Name: [Next competitor brand]
+- Products: Which product categories?
+- Customer's Current Status: Does customer stock it? How much?
+- Reasons for Preference: Why does customer prefer this brand than Naga in detail?
+    - [Price? Consumers Choice? Taste? Local brand? Habit? Promotions? etc..]
+- Category:
+    - [Based on the reason Categorize whether it is due to Price Concern or Discount Concern or Product Variety or Product Package Size or Other factors]
+      IMPORTANT - Choose the Category only on the list of reasons mentioned above, dont change the list.
+
+**Brand 3:** (Continue for each additional competitor brand mentioned until all are covered)
+- Brand Name: [Next competitor brand]
+- Products: Which product categories?
+- Customer's Current Status: Does customer stock it? How much?
+- Reasons for Preference: Why does customer prefer this brand than Naga in detail?
+    - [Price? Consumers Choice? Taste? Local brand? Habit? Promotions? etc..]
+- Category:
+    - [Based on the reason Categorize whether it is due to Price Concern or Discount Concern or Product Variety or Product Package Size or Other factors]
+      IMPORTANT - Choose the Category only on the list of reasons mentioned above, dont change the list.
+
+B. Online Retailers Mentioned
+For EACH online retailer mentioned, document separately:
+
+**Retailer 1:**
+- Name: [e.g., Amazon]
+- Product Range: What products do they offer?
+- Pricing Strategy: How do their prices compare to Naga?
+- Customer Perception: How do customers view this retailer?
+- Unique Selling Points: What makes this retailer stand out?
+
+**Retailer 2:**
+- Name: [Next online retailer]
+- Product Range: What products do they offer?
+- Pricing Strategy: How do their prices compare to Naga?
+- Customer Perception: How do customers view this retailer?
+- Unique Selling Points: What makes this retailer stand out?
+
+C. Customer Buying Psychology
+- What truly drives purchase decisions? (rank by importance)
+- Is it price, brand recognition, customer demand, margins, or something else?
+- Customer's risk tolerance (willing to try new brands?)
+- Stock rotation preferences (fast-moving vs slow-moving)
+- Is he open to switching if Naga offers better schemes or prices?
+- How is the customer buying behaviour? (Like is he buys product if more schemes are offered, or if the product is on discount, or if the product is a well-known brand, or if more free pieces are offered, etc.)
+
+------------------------------------------------------------
+
+5. Salesperson Effectiveness Score:
+
+Based on specific criteria - Score each component objectively.  
+
+IMPORTANT: If any criterion does not apply to this conversation (e.g., no competitor brands mentioned → Competitor handling = N/A), then:
+1. Mark that category as "N/A".
+2. Give full score for that category.
+
+---
+
+**Product promotion (30% weight):** _/10
+- 8-10: Presented 5+ Naga products with clear benefits and schemes
+- 6-7: Presented 3-4 Naga products adequately  
+- 4-5: Presented 1-2 Naga products with limited detail
+- 1-3: Minimal product presentation
+
+**Scheme leverage (20% weight):** _/10
+- 8-10: Actively promoted multiple schemes and free offers
+- 6-7: Mentioned some schemes but didn't emphasize strongly
+- 4-5: Basic mention of schemes without detail
+- 1-3: No schemes mentioned or poorly explained
+
+**Competitor handling (25% weight):** _/10
+- 8-10: Directly addressed competitor advantages with counter-arguments
+- 6-7: Acknowledged competitors but weak counter-positioning
+- 4-5: Mentioned competitors but didn't address customer concerns
+- 1-3: Failed to address competitive threats
+
+**Customer psychology understanding (25% weight):** _/10
+- 8-10: Clearly understood customer's priorities and adapted pitch accordingly
+- 6-7: Showed some understanding of customer needs
+- 4-5: Basic awareness of customer concerns
+- 1-3: Poor understanding of what drives customer decisions
+
+---
+
+**Final Score Calculation:**
+- If all 4 criteria apply:  
+  (Product promotion × 0.3) + (Scheme leverage × 0.2) + (Competitor handling × 0.25) + (Customer psychology × 0.25)  
+
+------------------------------------------------------------
+
+6. Salesperson Ability Analysis
+- How salesperson handles the conversation, objections, competitor mentions, and customer concerns.
+
+------------------------------------------------------------
+
+7. Product Price Analysis
+ What are all the Naga products that the customer thinks the price is too high?
+ If so, list them with details like which product, what price point, and customer's exact concerns.
+
+------------------------------------------------------------
+
+8. Salesperson Strengths
+- [Strength 1]
+- [Strength 2]
+- [Strength 3]
+
+------------------------------------------------------------
+
+9. Areas for Improvement
+- [Improvement 1]
+- [Improvement 2]
+- [Improvement 3]
+
+------------------------------------------------------------
+
+ANALYSIS RULES
+
+✓ Extract ALL numeric data (quantities, prices, pack sizes, margins, discounts)
+✓ Clearly separate Naga products from ALL competitor brands
+✓ Note EVERY competitor brand name mentioned - don't group them generically
+✓ Capture the customer's REAL reasons for preferences (not just what they say on surface)
+✓ Identify psychological factors beyond price (brand loyalty, habit, risk aversion, etc.)
+✓ Highlight cases where customer prefers competitor DESPITE Naga advantages
+✓ Document local/regional brand dynamics and home-ground advantages
+✓ Assess whether salesperson understood the customer's true concerns
+✓ Provide actionable, specific recommendations - not generic advice
+✓ Use a dynamic matrix - only include categories relevant to THIS conversation
+✓ Analyze audio by using both transcription as well as audio, as sometimes transcription might help in understanding the context better and audio might give better clarity on tone, emphasis, pauses, etc.
+✓ Clearly Identify the Salesperson and the Customer in the conversation before analysis by the conversation context.
+✓ Identify in what context does the salesperson is addressing about the price of the Naga product is high or low than the competitors before adding it to the price analysis section or at some other sections, Because sometimes the salesperson might be saying that the price is low compared to competitors, not high so it should not be added to the price analysis section as a high price concern. These things should be addressed carefully.
+✓ IMPORTANT: The Analysis report should be in English only.
+✓ Always cross-check the speaker before assigning brand ownership:
+  - Sales Rep statements = Naga context
+  - Customer statements = Competitor context
+  - Never assume ownership without confirming who said it.
+------------------------------------------------------------
+
+Brand & Product Mapping
+ 
+# Speaker & Brand Context Mapping
+| Speaker | Brand | Product | Context / Ownership Confirmation |
+|----------|--------|----------|--------------------------------|
+| Sales Rep | Naga | [Product] | Confirmed as Naga (own product) |
+| Customer | [Brand] | [Product] | Competitor product mentioned by customer |
+| Sales Rep | — | [Product] | No brand mentioned → assumed Naga |
+| Customer | — | [Product] | Ambiguous – Needs context |
+
+CONSISTENCY REQUIREMENTS
+
+For SCORING: Use the exact scoring rubric provided. Base scores on objective evidence from the conversation, not subjective impressions.
+
+For ANALYSIS: Focus on factual observations. Use specific quotes and examples from the conversation rather than generalizations.
+
+For RECOMMENDATIONS: Base suggestions on specific gaps identified in the conversation, not generic sales advice.
+
+------------------------------------------------------------
+
+------------------------------------------------------------
+
+MANDATORY OUTPUT FORMAT - FOLLOW THIS EXACT STRUCTURE
+
+You MUST follow this precise format. Do NOT write in paragraph style.
+
+**TEMPLATE STRUCTURE:**
+
+# Brand & Product Mapping
+
+A. Naga Brand Products
+- [Product 1]
+- [Product 2]
+- [Product 3]
+
+B. Competitor Brands Mentioned
+- [Brand Name]: [Product categories]
+
+------------------------------------------------------------
+
+# 1. Conversation Summary
+- [Summary point 1]
+- [Summary point 2]
+- [Summary point 3]
+
+------------------------------------------------------------
+
+# 2. Sales Matrix
+
+**Naga Products Performance**
+- Naga products promoted: [Details]
+- Volume pushed / upselling: [Details]
+- Schemes offered: [Details with specifics]
+- Cross-selling within Naga portfolio: [Details]
+- Acceptance/Rejection: [Details]
+
+**Sales Barriers**
+- Objections raised: [Details]
+- Competitor advantages cited: [Details]
+
+------------------------------------------------------------
+
+# 3. Customer Buying Patterns
+
+A. Regularly buying products (Customer commits to buy BEFORE schemes OR shows clear intent regardless of schemes)
+    - [Products List - immediate interest/commitment or clear intent to buy regardless]
+    
+B. Scheme Based Orders (Customer commits to buy ONLY BECAUSE schemes influenced their decision)
+    - [Products List - hesitation turned to purchase, or quantity increased due to schemes]------------------------------------------------------------
+
+# 4. Competitive Intelligence & Customer Psychology
+
+A. Competitor Brand Analysis
+
+**Brand 1:**
+- Brand Name: [Name]
+- Products: [Categories]
+- Customer's Current Status: [Details]
+- Reasons for Preference: [Detailed reasons]
+- Category: Price Concern / Discount Concern / Product Variety / Product Package Size / Other factors
+
+**Brand 2:**
+- Brand Name: [Name]
+- Products: [Categories]
+- Customer's Current Status: [Details]
+- Reasons for Preference: [Detailed reasons]
+- Category: Price Concern / Discount Concern / Product Variety / Product Package Size / Other factors
+
+**Brand 3:** (Continue for each additional competitor brand mentioned until all are covered)
+- Brand Name: [Name]
+- Products: [Categories]    
+- Customer's Current Status: [Details]
+- Reasons for Preference: [Detailed reasons]
+- Category: Price Concern / Discount Concern / Product Variety / Product Package Size / Other factors
+
+B. Online Retailers Mentioned
+**Retailer 1:**
+- Name: [Name]
+- Product Range: [Details]
+- Pricing Strategy: [Details]
+- Customer Perception: [Details]
+- Unique Selling Points: [Details]
+
+**Retailer 2:** (Continue for each additional online retailer mentioned until all are covered) 
+- Name: [Name]
+- Product Range: [Details]
+- Pricing Strategy: [Details]
+- Customer Perception: [Details]
+- Unique Selling Points: [Details]
+
+C. Customer Buying Psychology
+- What truly drives purchase decisions: [Ranked list]
+- Customer's risk tolerance: [Details]
+- Stock rotation preferences: [Details]
+- Openness to switching brands: [Details]
+- How is the customer buying behaviour: [Details]
+
+------------------------------------------------------------
+
+# 5. Salesperson Effectiveness Score
+
+**Product promotion (30% weight):** _/10
+**Scheme leverage (20% weight):** _/10
+**Competitor handling (25% weight):** _/10
+**Customer psychology understanding (25% weight):** _/10
+
+**Final Score Calculation:**
+[Calculation formula] = _/10
+
+------------------------------------------------------------
+
+# 6. Salesperson Ability Analysis
+- [Summary]
+
+------------------------------------------------------------
+
+# 7. Product Price Analysis
+- [Summary]
+
+------------------------------------------------------------
+
+# 8. Salesperson Strengths
+- [Strength 1]
+- [Strength 2]
+- [Strength 3]
+
+------------------------------------------------------------
+
+# 9. Areas for Improvement
+- [Improvement 1]
+- [Improvement 2]
+- [Improvement 3]
+
+------------------------------------------------------------
+
+CRITICAL REMINDERS
+
+- DO NOT assume any brand is Naga unless explicitly stated
+- DO NOT group competitors as "other brands" – name each specifically
+- DO capture both stated reasons AND underlying psychology
+- DO identify non-price factors driving brand preference
+- DO note when customer prefers competitor despite Naga being cheaper/better
+- FOLLOW THE EXACT FORMAT ABOVE - DO NOT DEVIATE TO PARAGRAPH STYLE
+"""
+
+# Report template and reminders, reused when merging segment reports
+OUTPUT_FORMAT = ANALYSIS_PROMPT[ANALYSIS_PROMPT.index("MANDATORY OUTPUT FORMAT"):]
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    # Chosen once per process from ANALYSIS_BACKEND ("gemini" or "fake") and
+    # wrapped with timeouts, retries, a circuit breaker and optional hedging
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = with_resilience(create_backend())
+        return _backend
+
+
+def set_backend(backend):
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+_usage_totals = {"calls": 0, "prompt_tokens": 0, "audio_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+_usage_lock = threading.Lock()
+
+
+def record_usage(usage):
+    with _usage_lock:
+        _usage_totals["calls"] += 1
+        for name in ("prompt_tokens", "audio_tokens", "output_tokens", "cached_tokens"):
+            _usage_totals[name] += usage.get(name) or 0
+
+
+def _account_usage(usage, seconds, first_token_seconds=None):
+    # Every model request goes through here: the process totals and the
+    # current telemetry record
+    record_usage(usage)
+    telemetry.add_usage(usage, seconds, first_token_seconds)
+
+
+def usage_totals():
+    # Token totals for this process, including how much of the input was the
+    # repeated static prompt rather than audio
+    with _usage_lock:
+        totals = dict(_usage_totals)
+    input_tokens = totals["prompt_tokens"] + totals["audio_tokens"]
+    totals["prompt_share"] = totals["prompt_tokens"] / input_tokens if input_tokens else 0.0
+    return totals
+
+
+def _cache_model(backend, model_name, suffix=""):
+    # Non-Gemini backends get their own key space so fake reports never leak
+    # into real results; each output mode gets its own as well
+    cache_model = model_name if backend.name == "gemini" else f"{backend.name}/{model_name}"
+    return cache_model + suffix
+
+
+def _cached_report(cache, backend, audio_file, suffix):
+    # The report cached under any model the router could pick, or None.
+    # Checked before routing, so a repeat upload never waits on the duration
+    # probe.
+    if cache is None:
+        return None
+    models = {
+        make_cache_key(audio_file, ANALYSIS_PROMPT, _cache_model(backend, model_name, suffix)): model_name
+        for model_name in candidate_models(MODEL_NAME)
+    }
+    key, entry = cache.get_any(models)
+    if entry is None:
+        return None
+    telemetry.annotate(cache_hit=True, model=models[key], recording_id=entry.get("recording_id"))
+    return entry.get("text")
+
+
+def _annotate_route(decision, audio_file):
+    # Only called on a cache miss. The router skips the duration probe when
+    # routing is off, so it is measured here, for the telemetry record.
+    if not MODEL_ROUTING:
+        decision.duration_seconds, decision.duration_source = estimate_duration(audio_file)
+    telemetry.annotate(
+        model=decision.model,
+        audio_seconds=decision.duration_seconds,
+        duration_source=decision.duration_source,
+    )
+
+
+def _dedupe_variant(backend, suffix=""):
+    # Re-exports share a report per backend, output mode and prompt, whichever
+    # model the router picked (duration estimates differ between containers)
+    return make_cache_key(b"", ANALYSIS_PROMPT, backend.name + suffix)
+
+
+def _lookup_duplicate(audio_file, variant):
+    # Returns (fingerprint, recording_id, report); report is set when the
+    # recording matches one analyzed before
+    try:
+        fingerprint = compute_fingerprint(audio_file)
+        if fingerprint is None:
+            return None, None, None
+        index = get_fingerprint_index()
+        match = index.find(fingerprint)
+        if match is None:
+            return fingerprint, None, None
+        report = index.get_report(match.recording_id, variant)
+    except sqlite3.Error as e:
+        logger.warning("Fingerprint lookup failed: %s", e)
+        return None, None, None
+    if report is not None:
+        logger.info(
+            "Recording matches earlier recording %d (bit error rate %.3f), reusing its report",
+            match.recording_id, match.bit_error_rate,
+        )
+        telemetry.annotate(
+            cache_hit=True, duplicate_of=match.recording_id, duplicate_bit_error_rate=match.bit_error_rate,
+            recording_id=match.recording_id,
+        )
+    return fingerprint, match.recording_id, report
+
+
+def _remember_report(fingerprint, recording_id, variant, report):
+    # Returns the recording's id in the fingerprint index (None without a
+    # fingerprint). Callers store calls under it, so a re-export of a call
+    # replaces its row in the call store instead of adding another.
+    if fingerprint is None:
+        return None
+    try:
+        index = get_fingerprint_index()
+        if recording_id is None:
+            recording_id = index.add(fingerprint)
+        index.put_report(recording_id, variant, report)
+    except sqlite3.Error as e:
+        logger.warning("Could not store fingerprint: %s", e)
+        return None
+    telemetry.annotate(recording_id=recording_id)
+    return recording_id
+
+
+def _markdown_problem(text):
+    missing = missing_sections(text)
+    return f"missing sections {', '.join(missing)}" if missing else None
+
+
+def _json_problem(text):
+    try:
+        validate_report(text)
+    except ReportValidationError as e:
+        return str(e)
+    return None
+
+
+def _routed_request(backend, audio_file, decision, find_problem, **kwargs):
+    # Runs the request on the routed model and logs the outcome. A reply that
+    # find_problem() rejects is retried once on the stronger model, if the
+    # router allows it; otherwise it is returned as is.
+    started_at = time.perf_counter()
+    try:
+        response = _request_analysis(backend, audio_file, decision.model, **kwargs)
+    except Exception as e:
+        log_decision(decision, status="error", error=type(e).__name__,
+                     seconds=round(time.perf_counter() - started_at, 3))
+        raise
+
+    telemetry.annotate(model=decision.model, escalated_from=decision.escalated_from)
+    problem = find_problem(response.text)
+    log_decision(
+        decision,
+        status="invalid" if problem else "ok",
+        problem=problem,
+        seconds=round(time.perf_counter() - started_at, 3),
+        first_token_seconds=response.first_token_seconds,
+        usage=response.usage,
+    )
+    if problem:
+        escalated = escalate(decision, problem)
+        if escalated is not None:
+            return _routed_request(backend, audio_file, escalated, find_problem, **kwargs)
+    return response
+
+
+def _request_analysis(backend, audio_file, model_name, context=None, response_schema=None, on_chunk=None):
+    # Normalize after the cache lookup, which is keyed on the original upload
+    audio = normalize_audio(audio_file, enabled=PREPROCESS_AUDIO)
+    logger.info(
+        "Audio %s: %d -> %d bytes (%d saved, transcoded=%s)",
+        audio.container, audio.original_bytes, audio.output_bytes, audio.bytes_saved, audio.transcoded,
+    )
+
+    telemetry.annotate(sent_bytes=audio.output_bytes, bytes_saved=audio.bytes_saved, transcoded=audio.transcoded)
+
+    started_at = time.perf_counter()
+    response = backend.analyze(
+        ANALYSIS_PROMPT, audio.data, audio.mime_type, model_name,
+        context=context, response_schema=response_schema, on_chunk=on_chunk,
+    )
+    _account_usage(response.usage, time.perf_counter() - started_at, response.first_token_seconds)
+    logger.info(
+        "Analysis on %s took %.1fs (first token %.1fs): %s prompt + %s audio tokens in (%s cached), %s out",
+        model_name,
+        time.perf_counter() - started_at,
+        response.first_token_seconds or 0.0,
+        response.usage.get("prompt_tokens"),
+        response.usage.get("audio_tokens"),
+        response.usage.get("cached_tokens"),
+        response.usage.get("output_tokens"),
+    )
+    return response
+
+
+def analyze_audio_with_gemini(audio_file, use_cache=True, backend=None, segmented=None, on_chunk=None):
+    # on_chunk(text_so_far), if given, receives the report as it streams in
+    # Configure generation parameters for consistency
+    # generation_config = genai.types.GenerationConfig(
+    #     temperature=0.0,  # Low temperature for more consistent responses
+    #     top_p=0.1,        # Reduce randomness in token selection
+    #     top_k=1,         # Limit vocabulary choices
+    #     max_output_tokens=4000,
+    #     candidate_count=1
+    # )
+
+    backend = backend or get_backend()
+    segmented = SEGMENTED_ANALYSIS if segmented is None else segmented
+
+    # Repeat uploads of the same recording are served from the local cache
+    cache = get_analysis_cache() if use_cache else None
+    suffix = "+segmented" if segmented else ""
+    cached = _cached_report(cache, backend, audio_file, suffix)
+    if cached is not None:
+        if on_chunk is not None:
+            on_chunk(cached)
+        return cached
+
+    # Entries are keyed on the routed model; a report that needed escalation
+    # is stored under the model first chosen, since the same upload would be
+    # routed (and escalated) the same way again
+    decision = choose_model(audio_file, MODEL_NAME)
+    _annotate_route(decision, audio_file)
+    cache_model = _cache_model(backend, decision.model, suffix)
+    cache_key = make_cache_key(audio_file, ANALYSIS_PROMPT, cache_model)
+
+    # Re-exports of the same call (other container or codec) have different
+    # bytes, so they are matched by how they sound instead
+    variant = _dedupe_variant(backend, suffix)
+    fingerprint = recording_id = None
+    if DEDUPE_AUDIO and cache is not None:
+        fingerprint, recording_id, duplicate = _lookup_duplicate(audio_file, variant)
+        if duplicate is not None:
+            if on_chunk is not None:
+                on_chunk(duplicate)
+            cache.put(cache_key, duplicate, cache_model, recording_id=recording_id)
+            return duplicate
+
+    text = None
+    if segmented:
+        started_at = time.perf_counter()
+        text = analyze_segmented(
+            audio_file, backend, ANALYSIS_PROMPT, OUTPUT_FORMAT, decision.model, on_usage=_account_usage,
+        )
+        if text is not None:
+            telemetry.annotate(segmented=True)
+            log_decision(decision, status="ok", segmented=True, seconds=round(time.perf_counter() - started_at, 3))
+            if on_chunk is not None:
+                on_chunk(text)
+
+    if text is None:
+        text = _routed_request(backend, audio_file, decision, _markdown_problem, on_chunk=on_chunk).text
+
+    recording_id = _remember_report(fingerprint, recording_id, variant, text)
+    if cache is not None:
+        cache.put(cache_key, text, cache_model, recording_id=recording_id)
+
+    return text
+
+
+def analyze_audio_structured(audio_file, use_cache=True, backend=None):
+    # Same analysis returned as a validated dict matching RESPONSE_SCHEMA; use
+    # render_report_markdown() for display. Always a single request (no
+    # segmented mode). Raises ReportValidationError on a malformed reply.
+    backend = backend or get_backend()
+
+    cache = get_analysis_cache() if use_cache else None
+    cached = _cached_report(cache, backend, audio_file, "+json")
+    if cached is not None:
+        return validate_report(cached)
+
+    decision = choose_model(audio_file, MODEL_NAME)
+    _annotate_route(decision, audio_file)
+    cache_model = _cache_model(backend, decision.model, "+json")
+    cache_key = make_cache_key(audio_file, ANALYSIS_PROMPT, cache_model)
+
+    variant = _dedupe_variant(backend, "+json")
+    fingerprint = recording_id = None
+    if DEDUPE_AUDIO and cache is not None:
+        fingerprint, recording_id, duplicate = _lookup_duplicate(audio_file, variant)
+        if duplicate is not None:
+            cache.put(cache_key, duplicate, cache_model, recording_id=recording_id)
+            return validate_report(duplicate)
+
+    response = _routed_request(
+        backend, audio_file, decision, _json_problem,
+        context=JSON_OUTPUT_INSTRUCTIONS, response_schema=RESPONSE_SCHEMA,
+    )
+    # Only reports that pass validation are cached
+    report = validate_report(response.text)
+
+    report_json = json.dumps(report, ensure_ascii=False)
+    recording_id = _remember_report(fingerprint, recording_id, variant, report_json)
+    if cache is not None:
+        cache.put(cache_key, report_json, cache_model, recording_id=recording_id)
+
+    return report
+
+
+def analyze_audio(audio_file, output=None, **kwargs):
+    # Entry point for callers that follow ANALYSIS_OUTPUT: returns markdown
+    # text, or the structured report dict in "json" mode
+    if (output or ANALYSIS_OUTPUT) == "json":
+        # Partial JSON isn't displayable, so structured mode doesn't stream
+        kwargs.pop("on_chunk", None)
+        return analyze_audio_structured(audio_file, **kwargs)
+    return analyze_audio_with_gemini(audio_file, **kwargs)
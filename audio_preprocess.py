@@ -0,0 +1,156 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+
+
+# Speech-oriented output: mono, 16 kHz, low-bitrate Opus in an Ogg container
+TARGET_SAMPLE_RATE = 16000
+TARGET_BITRATE = os.getenv("AUDIO_TARGET_BITRATE", "24k")
+TARGET_MIME_TYPE = "audio/ogg"
+# Pauses longer than this are cut down; quieter than the threshold counts as silence
+SILENCE_MIN_SECONDS = float(os.getenv("AUDIO_SILENCE_MIN_SECONDS", "1.5"))
+SILENCE_THRESHOLD_DB = int(os.getenv("AUDIO_SILENCE_THRESHOLD_DB", "-45"))
+FFMPEG_TIMEOUT_SECONDS = 120
+
+# Container name -> MIME type Gemini expects
+CONTAINER_MIME_TYPES = {
+    'mp3': 'audio/mp3',
+    'wav': 'audio/wav',
+    'ogg': 'audio/ogg',
+    'flac': 'audio/flac',
+    'aac': 'audio/aac',
+    'aiff': 'audio/aiff',
+    'mp4': 'audio/mp4',
+    'webm': 'audio/webm',
+}
+
+
+@dataclass
+class NormalizedAudio:
+    data: bytes
+    mime_type: str
+    container: str
+    original_bytes: int
+    transcoded: bool = False
+
+    @property
+    def output_bytes(self):
+        return len(self.data)
+
+    @property
+    def bytes_saved(self):
+        return self.original_bytes - self.output_bytes
+
+
+def detect_container(audio_bytes):
+    # Sniff the real container from magic bytes; file extensions lie
+    # (WhatsApp exports like "x.aac.mp3" are common)
+    head = bytes(audio_bytes[:16])
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'FORM' and head[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if head[4:8] == b'ftyp':
+        return 'mp4'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    if head[:3] == b'ID3':
+        return 'mp3'
+    if len(head) >= 2 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0:
+        # Both MP3 frames and ADTS AAC start with a sync word; ADTS has layer bits 00
+        return 'aac' if (head[1] & 0xF6) == 0xF0 else 'mp3'
+    return 'unknown'
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None
+
+
+def _ffmpeg_filters():
+    return ",".join([
+        # Telephone-band speech; drops rumble and most hiss/hold-tone energy
+        "highpass=f=100",
+        "lowpass=f=7000",
+        "afftdn=nf=-25",
+        # Cut every pause longer than SILENCE_MIN_SECONDS, including leading silence
+        f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD_DB}dB"
+        f":stop_periods=-1:stop_duration={SILENCE_MIN_SECONDS}:stop_threshold={SILENCE_THRESHOLD_DB}dB",
+    ])
+
+
+def encode_speech(input_path, output_path, start=None, duration=None, trim_silence=True):
+    # Encode (part of) a file on disk to the speech format sent for analysis
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    if start is not None:
+        command += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        command += ["-t", f"{duration:.3f}"]
+    command += ["-i", input_path, "-vn", "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE)]
+    if trim_silence:
+        command += ["-af", _ffmpeg_filters()]
+    command += ["-c:a", "libopus", "-b:a", TARGET_BITRATE, "-application", "voip", output_path]
+    subprocess.run(command, check=True, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS)
+
+
+def transcode_for_speech(audio_bytes):
+    # MP4/M4A may keep their index at the end of the file, so ffmpeg gets a
+    # real seekable file rather than a pipe
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "input")
+        output_path = os.path.join(tmp_dir, "output.ogg")
+        with open(input_path, "wb") as f:
+            f.write(audio_bytes)
+        encode_speech(input_path, output_path)
+        with open(output_path, "rb") as f:
+            return f.read()
+
+
+def probe_duration(audio_path):
+    # Length in seconds via ffprobe, or None when it isn't installed/readable
+    if shutil.which("ffprobe") is None:
+        return None
+    try:
+        completed = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
+            check=True, capture_output=True, text=True, timeout=30,
+        )
+        return float(completed.stdout.strip())
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return None
+
+
+def normalize_audio(audio_bytes, enabled=True):
+    audio_bytes = bytes(audio_bytes)
+    container = detect_container(audio_bytes)
+    result = NormalizedAudio(
+        data=audio_bytes,
+        mime_type=CONTAINER_MIME_TYPES.get(container, 'audio/mp3'),
+        container=container,
+        original_bytes=len(audio_bytes),
+    )
+
+    if enabled and ffmpeg_available():
+        try:
+            transcoded = transcode_for_speech(audio_bytes)
+        except (subprocess.SubprocessError, OSError):
+            # Undecodable or exotic input: send the original untouched
+            transcoded = None
+        # Silence removal can leave nothing on an all-silent clip; keep the
+        # original then, and whenever transcoding didn't actually shrink it
+        if transcoded and len(transcoded) < len(audio_bytes):
+            result = NormalizedAudio(
+                data=transcoded,
+                mime_type=TARGET_MIME_TYPE,
+                container=container,
+                original_bytes=len(audio_bytes),
+                transcoded=True,
+            )
+
+    return result
@@ -0,0 +1,378 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+from report_schema import COMPETITOR_CATEGORIES, SCORE_FIELDS, render_report_markdown
+
+
+logger = logging.getLogger(__name__)
+
+# Keep the static analysis prompt in Gemini's context cache so only the audio
+# is sent per request. Falls back to sending the prompt inline when the model
+# or account doesn't support caching.
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0"
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+# After a failed cache creation, don't try again for this long
+PROMPT_CACHE_RETRY_SECONDS = 600
+# HTTP timeout for a single Gemini request (shares the per-attempt limit
+# used by resilience.RetryPolicy)
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "300"))
+
+
+@dataclass
+class AnalysisResponse:
+    text: str
+    model: str
+    usage: dict = field(default_factory=dict)
+    # Seconds from sending the request to the first chunk / the full reply
+    first_token_seconds: float = None
+    total_seconds: float = None
+
+
+class BackendError(Exception):
+    # Raised by backends for failed requests; status_code mirrors the HTTP
+    # status the real API would have returned
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AnalysisBackend:
+    """Interface every analysis backend implements."""
+
+    name = "base"
+
+    def analyze(self, prompt, audio_bytes, mime_type="audio/mp3", model_name=None, context=None,
+                response_schema=None, on_chunk=None):
+        # prompt is the static instruction text shared by every call; context
+        # is optional per-call text (e.g. which segment this is) sent with the
+        # audio. With a response_schema the reply text is JSON matching it.
+        # With on_chunk the reply is streamed and on_chunk(text_so_far) is
+        # called as each chunk arrives.
+        raise NotImplementedError
+
+    def generate_text(self, prompt, model_name=None, response_schema=None):
+        # Text-only request, e.g. merging segment reports
+        raise NotImplementedError
+
+
+def _usage_value(usage_metadata, name):
+    return int(getattr(usage_metadata, name, 0) or 0) if usage_metadata is not None else 0
+
+
+class GeminiBackend(AnalysisBackend):
+    name = "gemini"
+
+    def __init__(self, api_key=None, context_cache=GEMINI_CONTEXT_CACHE):
+        self.api_key = api_key
+        self.context_cache = context_cache
+        self._configured = False
+        self._lock = threading.Lock()
+        # (model, prompt hash) -> CachedContent / time of last failed attempt
+        self._prompt_caches = {}
+        self._prompt_cache_failures = {}
+        self._prompt_cache_lock = threading.Lock()
+        # (model, prompt hash) -> token count of the static prompt
+        self._prompt_tokens = {}
+
+    def _genai(self):
+        # Configure the client on first use rather than at import time, so
+        # importing the app never needs an API key or network access
+        import google.generativeai as genai
+
+        with self._lock:
+            if not self._configured:
+                genai.configure(api_key=self.api_key or os.getenv("GOOGLE_API_KEY"))
+                self._configured = True
+        return genai
+
+    def _cached_prompt(self, genai, prompt, model_name):
+        key = (model_name, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        now = time.time()
+        with self._prompt_cache_lock:
+            entry = self._prompt_caches.get(key)
+            # Renew a minute early so a request never races the expiry
+            if entry is not None and entry[1] - now > 60:
+                return entry[0]
+            if now - self._prompt_cache_failures.get(key, 0) < PROMPT_CACHE_RETRY_SECONDS:
+                return None
+            try:
+                from google.generativeai import caching
+
+                cached = caching.CachedContent.create(
+                    model=f"models/{model_name}",
+                    display_name="sales-analysis-prompt",
+                    contents=[prompt],
+                    ttl=datetime.timedelta(seconds=PROMPT_CACHE_TTL_SECONDS),
+                )
+            except Exception as e:
+                logger.info("Context caching unavailable for %s, sending prompt inline: %s", model_name, e)
+                self._prompt_cache_failures[key] = now
+                return None
+            self._prompt_caches[key] = (cached, now + PROMPT_CACHE_TTL_SECONDS)
+            return cached
+
+    def _static_prompt_tokens(self, genai, prompt, model_name):
+        # Counted once per process; it's the same for every recording
+        key = (model_name, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        if key not in self._prompt_tokens:
+            try:
+                self._prompt_tokens[key] = genai.GenerativeModel(model_name).count_tokens(prompt).total_tokens
+            except Exception:
+                return None
+        return self._prompt_tokens[key]
+
+    def _usage(self, response, prompt_tokens):
+        metadata = getattr(response, "usage_metadata", None)
+        input_tokens = _usage_value(metadata, "prompt_token_count")
+        audio_tokens = None
+        for detail in getattr(metadata, "prompt_tokens_details", None) or []:
+            if "AUDIO" in str(getattr(detail, "modality", "")):
+                audio_tokens = int(detail.token_count)
+        if audio_tokens is None and prompt_tokens is not None:
+            audio_tokens = max(0, input_tokens - prompt_tokens)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "audio_tokens": audio_tokens,
+            "input_tokens": input_tokens,
+            "cached_tokens": _usage_value(metadata, "cached_content_token_count"),
+            "output_tokens": _usage_value(metadata, "candidates_token_count"),
+            "total_tokens": _usage_value(metadata, "total_token_count"),
+        }
+
+    @staticmethod
+    def _generation_config(response_schema):
+        if response_schema is None:
+            return None
+        return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+    def analyze(self, prompt, audio_bytes, mime_type="audio/mp3", model_name=None, context=None,
+                response_schema=None, on_chunk=None):
+        genai = self._genai()
+        audio_part = {"mime_type": mime_type, "data": audio_bytes}
+        per_call_parts = ([context] if context else []) + [audio_part]
+        generation_config = self._generation_config(response_schema)
+        stream = on_chunk is not None
+
+        started_at = time.perf_counter()
+        cached = self._cached_prompt(genai, prompt, model_name) if self.context_cache else None
+        if cached is not None:
+            model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+            contents = per_call_parts
+        else:
+            model = genai.GenerativeModel(model_name)
+            contents = [prompt] + per_call_parts
+        response = model.generate_content(
+            contents,
+            generation_config=generation_config,
+            stream=stream,
+            request_options={"timeout": REQUEST_TIMEOUT_SECONDS},
+        )
+
+        first_token_seconds = None
+        if stream:
+            text = ""
+            for chunk in response:
+                if first_token_seconds is None:
+                    first_token_seconds = time.perf_counter() - started_at
+                text += chunk.text
+                on_chunk(text)
+        else:
+            text = response.text
+        total_seconds = time.perf_counter() - started_at
+
+        prompt_tokens = self._static_prompt_tokens(genai, prompt, model_name)
+        usage = self._usage(response, prompt_tokens)
+        usage["context_cached"] = cached is not None
+        return AnalysisResponse(
+            text=text,
+            model=model_name,
+            usage=usage,
+            first_token_seconds=first_token_seconds if stream else total_seconds,
+            total_seconds=total_seconds,
+        )
+
+    def generate_text(self, prompt, model_name=None, response_schema=None):
+        genai = self._genai()
+        model = genai.GenerativeModel(model_name)
+        response = model.generate_content(
+            prompt,
+            generation_config=self._generation_config(response_schema),
+            request_options={"timeout": REQUEST_TIMEOUT_SECONDS},
+        )
+        return AnalysisResponse(text=response.text, model=model_name, usage=self._usage(response, None))
+
+
+FAKE_BRANDS = ['Nandi', 'Sankar', 'Shakti', 'Aachi', 'MTR', 'Britannia']
+FAKE_PRODUCTS = ['Maida', 'Rava', 'Godhumai Maavu', 'Rava Dosai Mix', 'Kadalai Maavu', 'Rusk', 'Masala Noodles']
+
+
+class FakeBackend(AnalysisBackend):
+    """Offline backend returning canned reports with simulated latency and failures.
+
+    Output and latency are derived from a hash of the audio, so the same file
+    always produces the same report; only error injection varies per call.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=2.0, jitter=0.5, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self._errors = random.Random(seed)
+        self._errors_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.getenv("FAKE_BACKEND_LATENCY", "2.0")),
+            jitter=float(os.getenv("FAKE_BACKEND_JITTER", "0.5")),
+            error_rate=float(os.getenv("FAKE_BACKEND_ERROR_RATE", "0.0")),
+            seed=int(os.getenv("FAKE_BACKEND_SEED", "0")),
+        )
+
+    def _rng_for(self, audio_bytes):
+        digest = hashlib.sha256(bytes(audio_bytes)).digest()
+        return random.Random(int.from_bytes(digest[:8], "big") ^ self.seed)
+
+    def report_data(self, rng):
+        # A plausible structured report; markdown mode renders the same data
+        products = rng.sample(FAKE_PRODUCTS, 3)
+        competitor = rng.choice(FAKE_BRANDS)
+        competitor_product = rng.choice(FAKE_PRODUCTS)
+        category = rng.choice(COMPETITOR_CATEGORIES)
+        scores = {name: rng.randint(4, 10) for name in SCORE_FIELDS}
+        if rng.random() < 0.2:
+            scores["competitor_handling"] = None
+        return {
+            "naga_products": products,
+            "competitor_brands": [{"brand": competitor, "products": [competitor_product]}],
+            "conversation_summary": [
+                f"The salesperson visited the store and pitched {products[0]} and {products[1]}.",
+                f"The customer currently stocks {competitor} {competitor_product} and compared prices.",
+                f"An order was discussed after the scheme on {products[0]} was explained.",
+            ],
+            "products_promoted": [
+                {"product": products[0], "customer_response": "Agreed to order", "outcome": "Accepted"},
+                {"product": products[1], "customer_response": "Will decide next visit", "outcome": "Undecided"},
+                {"product": products[2], "customer_response": "Enough stock already", "outcome": "Rejected"},
+            ],
+            "volume_upselling": f"Suggested a larger pack of {products[0]}",
+            "schemes": [{"product": products[0], "description": f"1 free {products[1]} with every 10 {products[0]}"}],
+            "cross_selling": f"Bundled {products[0]} with {products[1]}",
+            "objections": [f"{category} on {products[0]}"],
+            "competitor_advantages": [f"{competitor} offers a better margin"],
+            "regular_buying_products": [products[0]],
+            "scheme_based_products": [products[1]],
+            "competitors": [{
+                "brand": competitor,
+                "products": [competitor_product],
+                "current_status": f"Stocks {competitor} regularly",
+                "reasons": "Customers ask for it by name and the margin is higher",
+                "category": category,
+            }],
+            "online_retailers": [],
+            "buying_psychology": {
+                "purchase_drivers": ["Margin", "Customer demand", "Schemes"],
+                "risk_tolerance": "Moderate",
+                "stock_rotation": "Prefers fast-moving items",
+                "openness_to_switching": "Open if schemes improve",
+                "buying_behaviour": "Buys more when free pieces are offered",
+            },
+            "scores": scores,
+            "ability_analysis": f"Handled the {category.lower()} objection with a scheme rather than a price argument.",
+            "price_concerns": [{
+                "product": products[0],
+                "price_point": "Per 1 kg pack",
+                "concern": f"Customer felt the price is higher than {competitor}",
+            }],
+            "strengths": ["Clear explanation of schemes", "Good rapport with the customer", "Persistent follow-up on the order"],
+            "improvements": [
+                "Counter competitor margins with concrete numbers",
+                "Pitch more of the Naga portfolio",
+                "Confirm order quantities before leaving",
+            ],
+        }
+
+    def analyze(self, prompt, audio_bytes, mime_type="audio/mp3", model_name=None, context=None,
+                response_schema=None, on_chunk=None):
+        # Roughly what Gemini charges: ~4 characters per text token and
+        # 32 tokens per second of audio (assuming ~128 kbps uploads)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "audio_tokens": int(len(audio_bytes) / 16000 * 32),
+            "context_cached": False,
+        }
+        return self._respond(self._rng_for(audio_bytes), model_name, usage, response_schema is not None, on_chunk)
+
+    def generate_text(self, prompt, model_name=None, response_schema=None):
+        usage = {"prompt_tokens": len(prompt) // 4, "audio_tokens": 0}
+        return self._respond(self._rng_for(prompt.encode("utf-8")), model_name, usage, response_schema is not None)
+
+    def _respond(self, rng, model_name, usage, as_json=False, on_chunk=None):
+        started_at = time.perf_counter()
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        with self._errors_lock:
+            fail = self._errors.random() < self.error_rate
+            status_code = self._errors.choice([429, 500, 503])
+
+        if fail:
+            # Failing requests still take time, roughly like a real timeout
+            time.sleep(delay / 2)
+            raise BackendError(f"Simulated API error {status_code}", status_code=status_code)
+
+        data = self.report_data(rng)
+        text = json.dumps(data, ensure_ascii=False) if as_json else render_report_markdown(data)
+
+        if on_chunk is None:
+            time.sleep(delay)
+            first_token_seconds = time.perf_counter() - started_at
+        else:
+            # Like the real API: a pause before the first token, then the
+            # rest of the latency spread over the chunks
+            time.sleep(delay * 0.3)
+            first_token_seconds = time.perf_counter() - started_at
+            chunks = [text[i:i + 400] for i in range(0, len(text), 400)]
+            for i, _ in enumerate(chunks):
+                if i:
+                    time.sleep(delay * 0.7 / max(1, len(chunks) - 1))
+                on_chunk("".join(chunks[:i + 1]))
+
+        usage.setdefault("input_tokens", usage["prompt_tokens"] + usage["audio_tokens"])
+        usage.update({
+            "cached_tokens": 0,
+            "output_tokens": len(text) // 4,
+            "total_tokens": usage["input_tokens"] + len(text) // 4,
+        })
+        return AnalysisResponse(
+            text=text,
+            model=f"fake/{model_name}",
+            usage=usage,
+            first_token_seconds=first_token_seconds,
+            total_seconds=time.perf_counter() - started_at,
+        )
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeBackend.from_env,
+}
+
+
+def create_backend(name=None):
+    import dotenv
+
+    # Pick up GOOGLE_API_KEY / ANALYSIS_BACKEND from a local .env file
+    dotenv.load_dotenv()
+    name = (name or os.getenv("ANALYSIS_BACKEND", "gemini")).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown analysis backend '{name}'. Expected one of: {sorted(BACKENDS)}")
+    return BACKENDS[name]()
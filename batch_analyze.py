@@ -0,0 +1,214 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from analyzer import analyze_audio, set_backend, usage_totals
+from report_schema import render_report_markdown
+from resilience import with_resilience
+from backends import create_backend
+from call_store import record_call
+from telemetry import percentile, track_analysis
+
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.mp4', '.m4a', '.ogg', '.aac')
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def find_audio_files(input_dir):
+    audio_files = []
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                audio_files.append(os.path.join(root, name))
+    return sorted(audio_files)
+
+
+def report_path_for(audio_path, input_dir, output_dir):
+    # Mirror the input folder layout so identically named calls don't collide
+    relative = os.path.relpath(audio_path, input_dir)
+    base_filename = os.path.splitext(relative)[0]
+    return os.path.join(output_dir, f"{base_filename}_report.md")
+
+
+def salesperson_for(audio_path, input_dir):
+    # Recordings kept in per-salesperson subfolders ("audio/<name>/...") are
+    # attributed to that salesperson in the call store
+    parts = os.path.normpath(os.path.relpath(audio_path, input_dir)).split(os.sep)
+    return parts[0] if len(parts) > 1 else None
+
+
+def write_report(report_path, text):
+    # Write to a temp file first: a report on disk always means "finished",
+    # which is what resume relies on after a crash
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    tmp_path = f"{report_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, report_path)
+
+
+class Manifest:
+    # Append-only JSON lines log of every processed file, safe across threads
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+
+
+def analyze_file(audio_path, report_path, use_cache=True, segmented=None, output=None, salesperson=None,
+                 submitted_at=None):
+    # submitted_at: when the file was handed to the worker pool, so the time
+    # it waited for a free worker is part of its end-to-end latency
+    started_at = time.time()
+    queue_wait = round(started_at - submitted_at, 3) if submitted_at is not None else 0.0
+    record = {
+        "file": audio_path,
+        "report": report_path,
+        "bytes": os.path.getsize(audio_path),
+        "started_at": started_at,
+        "queue_wait_seconds": queue_wait,
+    }
+    try:
+        with open(audio_path, "rb") as f:
+            audio_data = f.read()
+        with track_analysis(
+            "batch", filename=audio_path, upload_bytes=len(audio_data), queue_wait_seconds=queue_wait,
+        ) as telemetry_record:
+            if output == "json":
+                report = analyze_audio(audio_data, output="json", use_cache=use_cache)
+                # JSON first: the markdown report is the "finished" marker for resume
+                write_report(
+                    os.path.splitext(report_path)[0] + ".json", json.dumps(report, ensure_ascii=False, indent=2),
+                )
+                analysis = render_report_markdown(report)
+            else:
+                report = analysis = analyze_audio(
+                    audio_data, output="markdown", use_cache=use_cache, segmented=segmented,
+                )
+        write_report(report_path, analysis)
+        # The recording's modification time is the best guess at the call date
+        record_call(
+            report,
+            audio_data,
+            filename=os.path.basename(audio_path),
+            salesperson=salesperson,
+            call_date=datetime.date.fromtimestamp(os.path.getmtime(audio_path)),
+            duration_seconds=telemetry_record.get("audio_seconds"),
+            model=telemetry_record.get("model"),
+            recording_id=telemetry_record.get("recording_id"),
+        )
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.time() - started_at, 3)
+    return record
+
+
+def run_batch(input_dir, output_dir, workers=4, force=False, use_cache=True, segmented=None, output=None):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME))
+
+    pending = []
+    skipped = 0
+    for audio_path in find_audio_files(input_dir):
+        report_path = report_path_for(audio_path, input_dir, output_dir)
+        if not force and os.path.exists(report_path):
+            skipped += 1
+            continue
+        pending.append((audio_path, report_path))
+
+    print(f"Found {len(pending) + skipped} audio files: {len(pending)} to analyze, {skipped} already done")
+
+    batch_started = time.time()
+    succeeded = failed = 0
+    latencies = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(
+                analyze_file, audio_path, report_path, use_cache, segmented, output,
+                salesperson_for(audio_path, input_dir), time.time(),
+            )
+            for audio_path, report_path in pending
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            manifest.append(record)
+            latencies.append(record["seconds"])
+            if record["status"] == "ok":
+                succeeded += 1
+                print(f"✅ {record['file']} ({record['seconds']}s)")
+            else:
+                failed += 1
+                print(f"❌ {record['file']}: {record['error']}", file=sys.stderr)
+
+    elapsed = time.time() - batch_started
+    summary = {
+        "analyzed": succeeded,
+        "failed": failed,
+        "skipped": skipped,
+        "seconds": round(elapsed, 3),
+        "files_per_minute": round(succeeded / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+        "tokens": usage_totals(),
+    }
+    print(f"Done: {summary}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze every sales call recording in a folder.")
+    parser.add_argument("input_dir", help="Folder containing audio recordings (searched recursively)")
+    parser.add_argument("-o", "--output-dir", default="reports", help="Where reports and the manifest are written")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Maximum concurrent analysis requests")
+    parser.add_argument("--force", action="store_true", help="Re-analyze files that already have a report")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local analysis cache")
+    parser.add_argument(
+        "--backend",
+        choices=["gemini", "fake"],
+        help="Analysis backend (defaults to ANALYSIS_BACKEND, then gemini). "
+             "'fake' returns canned reports offline for load testing.",
+    )
+    parser.add_argument(
+        "--segmented",
+        action="store_true",
+        default=None,
+        help="Split long calls into parallel segments and merge the results (needs ffmpeg)",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Request schema-validated structured reports and also write <name>_report.json",
+    )
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        set_backend(with_resilience(create_backend(args.backend)))
+
+    summary = run_batch(
+        args.input_dir,
+        args.output_dir,
+        workers=args.workers,
+        force=args.force,
+        use_cache=not args.no_cache,
+        segmented=args.segmented,
+        output="json" if args.json else "markdown",
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,590 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from report_schema import (
+    REPORT_SECTIONS, SCORE_FIELDS, final_score, parse_report_markdown, render_report_markdown, split_report_sections,
+)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("CALL_STORE_DB", os.path.join("cache", "calls.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    -- 'recording:<fingerprint id>', else the sha256 of the audio: analyzing the
+    -- same recording again replaces its row
+    source_key TEXT NOT NULL UNIQUE,
+    filename TEXT,
+    salesperson TEXT,
+    call_date TEXT NOT NULL,
+    -- YYYY-MM of call_date: the month partition the call belongs to
+    period TEXT NOT NULL,
+    duration_seconds REAL,
+    final_score REAL,
+    model TEXT,
+    report_markdown TEXT,
+    report_json TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_calls_period ON calls (period);
+CREATE INDEX IF NOT EXISTS idx_calls_salesperson ON calls (salesperson);
+CREATE INDEX IF NOT EXISTS idx_calls_call_date ON calls (call_date);
+
+CREATE TABLE IF NOT EXISTS call_products (
+    call_id INTEGER NOT NULL REFERENCES calls (id) ON DELETE CASCADE,
+    product TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_call_products_call ON call_products (call_id);
+CREATE INDEX IF NOT EXISTS idx_call_products_product ON call_products (product);
+
+CREATE TABLE IF NOT EXISTS call_competitors (
+    id INTEGER PRIMARY KEY,
+    call_id INTEGER NOT NULL REFERENCES calls (id) ON DELETE CASCADE,
+    brand TEXT NOT NULL,
+    category TEXT,
+    reasons TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_call_competitors_call ON call_competitors (call_id);
+CREATE INDEX IF NOT EXISTS idx_call_competitors_brand ON call_competitors (brand);
+
+CREATE TABLE IF NOT EXISTS call_competitor_products (
+    competitor_id INTEGER NOT NULL REFERENCES call_competitors (id) ON DELETE CASCADE,
+    call_id INTEGER NOT NULL REFERENCES calls (id) ON DELETE CASCADE,
+    product TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_call_competitor_products_call ON call_competitor_products (call_id);
+CREATE INDEX IF NOT EXISTS idx_call_competitor_products_product ON call_competitor_products (product);
+
+CREATE TABLE IF NOT EXISTS call_schemes (
+    call_id INTEGER NOT NULL REFERENCES calls (id) ON DELETE CASCADE,
+    product TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_call_schemes_call ON call_schemes (call_id);
+
+CREATE TABLE IF NOT EXISTS call_price_concerns (
+    call_id INTEGER NOT NULL REFERENCES calls (id) ON DELETE CASCADE,
+    product TEXT NOT NULL,
+    concern TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_call_price_concerns_call ON call_price_concerns (call_id);
+CREATE INDEX IF NOT EXISTS idx_call_price_concerns_product ON call_price_concerns (product);
+
+CREATE TABLE IF NOT EXISTS call_scores (
+    call_id INTEGER NOT NULL REFERENCES calls (id) ON DELETE CASCADE,
+    criterion TEXT NOT NULL,
+    -- NULL when the criterion was N/A for the call
+    score REAL,
+    PRIMARY KEY (call_id, criterion)
+);
+
+-- 'revision' counts writes, so caches of derived data know when to refresh
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Running totals per call day and per salesperson, kept up to date as calls
+# are added, replaced and deleted so the KPI pages never scan the calls table.
+# Any date range (week, month, quarter, ...) is the sum of its day rows, so a
+# query reads at most one row per day in range however long the history.
+# Sums travel with their counts: averages skip calls with no score/duration,
+# and a call's contribution can be subtracted again exactly.
+ROLLUP_DIMENSIONS = ('day', 'salesperson')
+ROLLUP_MEASURES = ['calls', 'scored_calls', 'score_sum', 'timed_calls', 'duration_sum'] + [
+    f"{name}_{suffix}" for name in SCORE_FIELDS for suffix in ('n', 'sum')
+]
+ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS rollups (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    {", ".join(f"{measure} REAL NOT NULL DEFAULT 0" for measure in ROLLUP_MEASURES)},
+    PRIMARY KEY (dimension, key)
+);
+"""
+
+# Full-text index of the stored reports, one row per call (rowid = calls.id)
+# and one column per report section, so a search can be limited to e.g. the
+# competitor or price analysis. Porter stemming lets "price" find "pricing".
+SEARCH_COLUMNS = list(REPORT_SECTIONS) + ['other']
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS report_search USING fts5(
+    {", ".join(SEARCH_COLUMNS)},
+    tokenize = 'porter unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+SEARCH_OPERATORS = ('AND', 'OR', 'NOT')
+# Search index column -> name on the search page
+SEARCH_SECTION_LABELS = {
+    'competitors': "Competitive intelligence",
+    'prices': "Price analysis",
+    'sales': "Sales matrix (schemes, objections)",
+    'mapping': "Brand & product mapping",
+    'summary': "Conversation summary",
+    'buying_patterns': "Buying patterns",
+    'scores': "Effectiveness score",
+    'ability': "Ability analysis",
+    'strengths': "Strengths",
+    'improvements': "Areas for improvement",
+    'other': "Other text",
+}
+
+# Dashboard mention list -> (child table, column)
+MENTION_SOURCES = {
+    'Products Discussed': ('call_products', 'product'),
+    'Competitors': ('call_competitors', 'brand'),
+    'Competitor Products': ('call_competitor_products', 'product'),
+    'Pricing Concerns': ('call_price_concerns', 'product'),
+}
+
+
+def period_for(call_date):
+    return call_date.strftime("%Y-%m")
+
+
+def _date_filter(start, end, column="c.call_date"):
+    # SQL condition and parameters for an inclusive date range; either end
+    # may be open
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        conditions.append(f"{column} <= ?")
+        params.append(end.isoformat())
+    return " AND ".join(conditions) or "1", params
+
+
+def source_key_for(audio_bytes, recording_id=None):
+    # Calls are keyed on the recording's fingerprint id when there is one, so
+    # re-exports of a call (different bytes, same audio) share a row
+    if recording_id is not None:
+        return f"recording:{recording_id}"
+    return hashlib.sha256(bytes(audio_bytes)).hexdigest()
+
+
+def _contribution(final_score, duration_seconds, scores):
+    # What one call adds to the rollups of its month and salesperson
+    values = dict.fromkeys(ROLLUP_MEASURES, 0)
+    values['calls'] = 1
+    if final_score is not None:
+        values['scored_calls'], values['score_sum'] = 1, final_score
+    if duration_seconds is not None:
+        values['timed_calls'], values['duration_sum'] = 1, duration_seconds
+    for name, score in scores.items():
+        if score is not None:
+            values[f"{name}_n"], values[f"{name}_sum"] = 1, score
+    return values
+
+
+def _match_expression(text, sections=None):
+    # FTS5 MATCH expression for search box text: every word must appear, OR
+    # and NOT work between words, "quoted phrases" match as phrases and word*
+    # matches a prefix. Each term is quoted, so punctuation can't break the
+    # query syntax. None when there is nothing to search for.
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if word in SEARCH_OPERATORS:
+            if terms and terms[-1] not in SEARCH_OPERATORS:
+                terms.append(word)
+            continue
+        term = (phrase or word.replace('"', '')).rstrip('*').strip()
+        if term:
+            prefix = '*' if word.endswith('*') else ''
+            terms.append(f'"{term}"{prefix}')
+    while terms and terms[-1] in SEARCH_OPERATORS:
+        terms.pop()
+    if not terms:
+        return None
+    expression = " ".join(terms)
+    if sections:
+        expression = f"{{{' '.join(sections)}}} : ({expression})"
+    return expression
+
+
+def _ratio(total, count):
+    return total / count if count else None
+
+
+def _unique(items):
+    return list(dict.fromkeys(item.strip() for item in items if item and item.strip()))
+
+
+class CallStore:
+    """One row per analyzed call, with products, competitors, schemes, price concerns and scores."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.executescript(ROLLUP_SCHEMA)
+            self._create_search_index(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create_search_index(self, conn):
+        # has_search is False when SQLite was built without FTS5: the store
+        # works, but reports aren't searchable
+        self.has_search = True
+        try:
+            conn.executescript(SEARCH_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning("Report search disabled, SQLite has no FTS5: %s", e)
+            self.has_search = False
+
+    def _index_report(self, conn, call_id, report_markdown):
+        if not self.has_search or not report_markdown:
+            return
+        # Heading lines would make a section-limited search match every
+        # report on words of the heading ("price" in the price analysis)
+        sections = split_report_sections(report_markdown, with_headings=False)
+        conn.execute(
+            f"INSERT INTO report_search (rowid, {', '.join(SEARCH_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' * len(SEARCH_COLUMNS))})",
+            [call_id] + [sections[column] for column in SEARCH_COLUMNS],
+        )
+
+    def _rebuild_search_index(self, conn):
+        conn.execute("DELETE FROM report_search")
+        for call in conn.execute("SELECT id, report_markdown FROM calls WHERE report_markdown IS NOT NULL"):
+            self._index_report(conn, call['id'], call['report_markdown'])
+
+    def rebuild_search_index(self):
+        # Re-indexes every stored report, e.g. after editing reports by hand
+        if self.has_search:
+            with self._transaction() as conn:
+                self._rebuild_search_index(conn)
+
+    @staticmethod
+    def _bump_revision(conn):
+        conn.execute(
+            "INSERT INTO store_meta (key, value) VALUES ('revision', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+        )
+
+    def revision(self):
+        rows = self.query("SELECT value FROM store_meta WHERE key = 'revision'")
+        return rows[0]['value'] if rows else 0
+
+    def _roll(self, conn, call, scores, sign):
+        # Adds (sign=1) or removes (sign=-1) one call's contribution
+        values = _contribution(call['final_score'], call['duration_seconds'], scores)
+        keys = {'day': call['call_date'], 'salesperson': call['salesperson']}
+        for dimension in ROLLUP_DIMENSIONS:
+            key = keys[dimension]
+            if key is None:
+                continue
+            conn.execute(
+                f"INSERT INTO rollups (dimension, key, {', '.join(ROLLUP_MEASURES)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(ROLLUP_MEASURES))}) "
+                "ON CONFLICT (dimension, key) DO UPDATE SET "
+                + ", ".join(f"{measure} = {measure} + excluded.{measure}" for measure in ROLLUP_MEASURES),
+                [dimension, key] + [sign * values[measure] for measure in ROLLUP_MEASURES],
+            )
+            # A primary-key lookup, not a scan of every rollup
+            conn.execute(
+                "DELETE FROM rollups WHERE dimension = ? AND key = ? AND calls <= 0", (dimension, key),
+            )
+
+    def _remove_call(self, conn, source_key):
+        # Deletes a call and takes it out of the rollups; False if unknown
+        call = conn.execute(
+            "SELECT id, call_date, salesperson, final_score, duration_seconds FROM calls WHERE source_key = ?",
+            (source_key,),
+        ).fetchone()
+        if call is None:
+            return False
+        scores = dict(conn.execute("SELECT criterion, score FROM call_scores WHERE call_id = ?", (call['id'],)))
+        self._roll(conn, call, scores, -1)
+        conn.execute("DELETE FROM calls WHERE id = ?", (call['id'],))
+        if self.has_search:
+            conn.execute("DELETE FROM report_search WHERE rowid = ?", (call['id'],))
+        self._bump_revision(conn)
+        return True
+
+    def _rebuild_rollups(self, conn):
+        conn.execute("DELETE FROM rollups")
+        scores_by_call = {}
+        for call_id, criterion, score in conn.execute("SELECT call_id, criterion, score FROM call_scores"):
+            scores_by_call.setdefault(call_id, {})[criterion] = score
+        calls = conn.execute("SELECT id, call_date, salesperson, final_score, duration_seconds FROM calls").fetchall()
+        for call in calls:
+            self._roll(conn, call, scores_by_call.get(call['id'], {}), 1)
+        self._bump_revision(conn)
+
+    def rebuild_rollups(self):
+        # Recomputes every rollup from the calls, e.g. after editing the
+        # database by hand
+        with self._transaction() as conn:
+            self._rebuild_rollups(conn)
+
+    def add_call(self, report, source_key, report_markdown=None, report_json=None, filename=None,
+                 salesperson=None, call_date=None, duration_seconds=None, model=None):
+        # report is a dict in the RESPONSE_SCHEMA shape (a full structured
+        # report or parse_report_markdown() output). Returns the call id.
+        call_date = call_date or datetime.date.today()
+        if isinstance(call_date, str):
+            call_date = datetime.date.fromisoformat(call_date[:10])
+        scores = {name: report.get("scores", {}).get(name) for name in SCORE_FIELDS}
+        # A report whose scores couldn't be read at all gets no final score,
+        # rather than full marks for four N/A criteria
+        call_score = final_score(scores) if any(v is not None for v in scores.values()) else None
+
+        with self._transaction() as conn:
+            # Re-analysis replaces the call; its child rows go with it
+            self._remove_call(conn, source_key)
+            call_id = conn.execute(
+                "INSERT INTO calls (source_key, filename, salesperson, call_date, period, duration_seconds, "
+                "final_score, model, report_markdown, report_json, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source_key, filename, (salesperson or "").strip() or None, call_date.isoformat(),
+                    period_for(call_date), duration_seconds, call_score, model,
+                    report_markdown, report_json, time.time(),
+                ),
+            ).lastrowid
+
+            conn.executemany(
+                "INSERT INTO call_products (call_id, product) VALUES (?, ?)",
+                [(call_id, product) for product in _unique(report.get("naga_products", []))],
+            )
+
+            competitors = list(report.get("competitors", []))
+            # Brands named in the mapping but left out of the detailed analysis
+            analyzed = {c["brand"].strip().lower() for c in competitors}
+            for mapped in report.get("competitor_brands", []):
+                if mapped["brand"].strip().lower() not in analyzed:
+                    competitors.append({"brand": mapped["brand"], "products": mapped.get("products", [])})
+            for competitor in competitors:
+                brand = competitor["brand"].strip()
+                if not brand:
+                    continue
+                competitor_id = conn.execute(
+                    "INSERT INTO call_competitors (call_id, brand, category, reasons) VALUES (?, ?, ?, ?)",
+                    (call_id, brand, competitor.get("category"), competitor.get("reasons")),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO call_competitor_products (competitor_id, call_id, product) VALUES (?, ?, ?)",
+                    [(competitor_id, call_id, product) for product in _unique(competitor.get("products", []))],
+                )
+
+            conn.executemany(
+                "INSERT INTO call_schemes (call_id, product, description) VALUES (?, ?, ?)",
+                [(call_id, s.get("product"), s.get("description")) for s in report.get("schemes", [])],
+            )
+            conn.executemany(
+                "INSERT INTO call_price_concerns (call_id, product, concern) VALUES (?, ?, ?)",
+                [(call_id, c["product"], c.get("concern")) for c in report.get("price_concerns", []) if c.get("product")],
+            )
+            conn.executemany(
+                "INSERT INTO call_scores (call_id, criterion, score) VALUES (?, ?, ?)",
+                [(call_id, name, score) for name, score in scores.items()],
+            )
+            self._index_report(conn, call_id, report_markdown)
+            self._roll(conn, {
+                'call_date': call_date.isoformat(),
+                'salesperson': (salesperson or "").strip() or None,
+                'final_score': call_score,
+                'duration_seconds': duration_seconds,
+            }, scores, 1)
+            self._bump_revision(conn)
+        return call_id
+
+    def delete_call(self, source_key):
+        with self._transaction() as conn:
+            return self._remove_call(conn, source_key)
+
+    def count_calls(self):
+        with self._transaction() as conn:
+            return conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+    def has_calls(self):
+        # Stops at the first row, unlike count_calls
+        with self._transaction() as conn:
+            return bool(conn.execute("SELECT EXISTS (SELECT 1 FROM calls)").fetchone()[0])
+
+    def query(self, sql, params=()):
+        with self._transaction() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    @staticmethod
+    def _summary(row):
+        summary = {
+            'calls': int(row['calls'] or 0),
+            'avg_score': _ratio(row['score_sum'], row['scored_calls']),
+            'total_seconds': row['duration_sum'] if row['timed_calls'] else None,
+            'avg_seconds': _ratio(row['duration_sum'], row['timed_calls']),
+        }
+        for name in SCORE_FIELDS:
+            summary[name] = _ratio(row[f"{name}_sum"], row[f"{name}_n"])
+        return summary
+
+    def kpis(self, start=None, end=None):
+        # Totals and averages over calls dated start..end (inclusive), or
+        # None when there are none
+        condition, params = _date_filter(start, end, column="key")
+        row = self.query(
+            f"SELECT {', '.join(f'SUM({measure}) AS {measure}' for measure in ROLLUP_MEASURES)} "
+            f"FROM rollups WHERE dimension = 'day' AND {condition}",
+            params,
+        )[0]
+        return self._summary(row) if row['calls'] else None
+
+    def date_bounds(self):
+        # (first, last) call date, or (None, None) for an empty store
+        row = self.query("SELECT MIN(key) AS first, MAX(key) AS last FROM rollups WHERE dimension = 'day'")[0]
+        if row['first'] is None:
+            return None, None
+        return datetime.date.fromisoformat(row['first']), datetime.date.fromisoformat(row['last'])
+
+    def periods(self):
+        # Months (YYYY-MM) that have calls, newest first
+        rows = self.query(
+            "SELECT DISTINCT substr(key, 1, 7) AS period FROM rollups WHERE dimension = 'day' ORDER BY period DESC"
+        )
+        return [row['period'] for row in rows]
+
+    def mention_counts(self, kind, start=None, end=None):
+        # [(name, mentions)] over calls dated start..end, most mentioned first
+        table, column = MENTION_SOURCES[kind]
+        condition, params = _date_filter(start, end)
+        sql = (
+            f"SELECT t.{column} AS name, COUNT(*) AS mentions FROM {table} t "
+            f"JOIN calls c ON c.id = t.call_id WHERE {condition} "
+            f"GROUP BY t.{column} ORDER BY mentions DESC, MIN(t.rowid)"
+        )
+        return [(row["name"], row["mentions"]) for row in self.query(sql, params)]
+
+    @staticmethod
+    def _call_filter(start, end, salesperson):
+        condition, params = _date_filter(start, end, column="call_date")
+        if salesperson is not None:
+            condition += " AND salesperson = ?"
+            params.append(salesperson)
+        return condition, params
+
+    def count_matching(self, start=None, end=None, salesperson=None):
+        condition, params = self._call_filter(start, end, salesperson)
+        return self.query(f"SELECT COUNT(*) AS calls FROM calls WHERE {condition}", params)[0]['calls']
+
+    def iter_calls(self, start=None, end=None, salesperson=None, batch_size=200):
+        # Calls dated start..end (of one salesperson, if given) with their
+        # stored reports, oldest first. Rows are fetched in batches as the
+        # caller iterates, so thousands of reports are never all in memory.
+        condition, params = self._call_filter(start, end, salesperson)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT id, filename, salesperson, call_date, report_markdown, report_json "
+                f"FROM calls WHERE {condition} ORDER BY call_date, id",
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            conn.close()
+
+    def search_reports(self, text, sections=None, start=None, end=None, salesperson=None, limit=50):
+        # (total matches, best `limit` matches) for search box text (see
+        # _match_expression) in the given report sections (default: all),
+        # among calls dated start..end of one salesperson, if given. Each
+        # match carries a snippet with the matched words in **bold**.
+        expression = _match_expression(text, sections) if self.has_search else None
+        if expression is None:
+            return 0, []
+        condition, params = self._call_filter(start, end, salesperson)
+        where = f"report_search MATCH ? AND {condition}"
+        # CROSS JOIN keeps the index lookup as the outer loop; otherwise SQLite
+        # may walk a salesperson's calls and run the MATCH once per call
+        source = "FROM report_search CROSS JOIN calls ON calls.id = report_search.rowid"
+        total = self.query(f"SELECT COUNT(*) AS matches {source} WHERE {where}", [expression] + params)[0]['matches']
+        matches = self.query(
+            "SELECT calls.id, filename, salesperson, call_date, final_score, "
+            f"snippet(report_search, -1, '**', '**', ' … ', 24) AS snippet {source} "
+            f"WHERE {where} ORDER BY rank LIMIT ?",
+            [expression] + params + [limit],
+        )
+        return total, matches
+
+    def salesperson_summary(self):
+        rows = self.query("SELECT * FROM rollups WHERE dimension = 'salesperson' ORDER BY key")
+        return [dict(self._summary(row), salesperson=row['key']) for row in rows]
+
+    def competitor_reasons(self):
+        # (product, competitor brand, category) for every competing product
+        return self.query(
+            "SELECT p.product, k.brand, COALESCE(k.category, 'Other factors') AS category "
+            "FROM call_competitor_products p JOIN call_competitors k ON k.id = p.competitor_id"
+        )
+
+
+def record_call(result, audio_bytes, filename=None, salesperson=None, call_date=None,
+                duration_seconds=None, model=None, recording_id=None, store=None):
+    # Adds a finished analysis (markdown text or structured dict) to the store.
+    # recording_id is the telemetry record's, set when the audio was
+    # fingerprinted. Never raises: the report has already been delivered.
+    try:
+        if isinstance(result, dict):
+            report = result
+            report_markdown = render_report_markdown(result)
+            report_json = json.dumps(result, ensure_ascii=False)
+        else:
+            report, report_markdown, report_json = parse_report_markdown(result), result, None
+        return (store or get_call_store()).add_call(
+            report,
+            source_key_for(audio_bytes, recording_id),
+            report_markdown=report_markdown,
+            report_json=report_json,
+            filename=filename,
+            salesperson=salesperson,
+            call_date=call_date,
+            duration_seconds=duration_seconds,
+            model=model,
+        )
+    except Exception as e:
+        logger.warning("Could not add call %s to the call store: %s", filename, e)
+        return None
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_call_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CallStore()
+        return _default_store
@@ -0,0 +1,335 @@
+import calendar
+import datetime
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import pandas as pd
+
+from call_store import MENTION_SOURCES, get_call_store
+from data_store import data_version, load_workbook
+from mentions import count_mentions, total_mentions
+from report_schema import SCORE_FIELDS
+
+
+MONTHS = list(calendar.month_name)[1:]
+
+# Rubric criterion -> column name used by individually.xlsx
+SCORE_COLUMNS = {
+    'product_promotion': 'Product promotion',
+    'scheme_leverage': 'Scheme leverage',
+    'competitor_handling': 'Competitor handling',
+    'customer_psychology': 'Customer psychology understanding',
+}
+
+# Optional data/salespeople.xlsx: SalesPerson plus the Team and/or Region each
+# rep belongs to, for cohort comparisons
+ROSTER_WORKBOOK = 'salespeople.xlsx'
+COHORT_COLUMNS = ['Team', 'Region']
+# Dimensions ranked against each cohort
+PERCENTILE_COLUMNS = ['Overall Sales Effectiveness'] + list(SCORE_COLUMNS.values())
+ALL_REPS = 'All reps'
+
+# Axes of the competitor cube: Naga product, competitor, reason they won
+CUBE_AXES = ['Products', 'Potential Competitors', 'Reason']
+MISMATCH_COLUMNS = ['Excel row'] + CUBE_AXES + ['Competitors', 'Reasons']
+
+_cohorts = None
+_cohorts_lock = threading.Lock()
+_cube = None
+_cube_lock = threading.Lock()
+# Values computed once per page render, see render_snapshot()
+_render = threading.local()
+
+
+@dataclass(frozen=True)
+class DateRange:
+    start: datetime.date
+    # Inclusive
+    end: datetime.date
+    label: str
+
+    @property
+    def month_name(self):
+        # The workbooks know months only by name, with no year
+        return MONTHS[self.start.month - 1]
+
+
+def month_range(year, month):
+    last_day = calendar.monthrange(year, month)[1]
+    return DateRange(datetime.date(year, month, 1), datetime.date(year, month, last_day),
+                     f"{MONTHS[month - 1]} {year}")
+
+
+def week_range(day):
+    # Monday to Sunday of the ISO week containing day
+    start = day - datetime.timedelta(days=day.weekday())
+    year, week, _ = day.isocalendar()
+    return DateRange(start, start + datetime.timedelta(days=6), f"Week {week}, {year}")
+
+
+def quarter_range(year, quarter):
+    first_month = 3 * (quarter - 1) + 1
+    return DateRange(month_range(year, first_month).start, month_range(year, first_month + 2).end,
+                     f"Q{quarter} {year}")
+
+
+def custom_range(start, end):
+    start, end = min(start, end), max(start, end)
+    return DateRange(start, end, f"{start:%d %b %Y} – {end:%d %b %Y}")
+
+
+def default_date_range():
+    # What the period pickers open on: the latest month with calls, or the
+    # current month of the workbooks
+    if use_call_store():
+        period = get_call_store().periods()[0]
+        return month_range(int(period[:4]), int(period[5:]))
+    today = datetime.date.today()
+    return month_range(today.year, today.month)
+
+
+@contextmanager
+def render_snapshot():
+    # A page asks whether to use the call store and for the data version from
+    # every chart and table. Inside this block (one Streamlit script run, in
+    # its own thread) each is computed once; outside, on every call.
+    _render.values = {}
+    try:
+        yield
+    finally:
+        _render.values = None
+
+
+def _once_per_render(name, compute):
+    values = getattr(_render, "values", None)
+    if values is None:
+        return compute()
+    if name not in values:
+        values[name] = compute()
+    return values[name]
+
+
+def use_call_store():
+    # Dashboards are computed from analyzed calls once there are any; until
+    # then they keep showing the hand-maintained workbooks
+    return _once_per_render('use_call_store', lambda: get_call_store().has_calls())
+
+
+def _minutes(seconds, digits):
+    return None if seconds is None else round(seconds / 60, digits)
+
+
+def period_kpis(date_range):
+    # The four headline numbers of a date range, or None when it has no data.
+    # The workbooks have one row per month name, so without a call store only
+    # the month of date_range.start counts.
+    if use_call_store():
+        kpis = get_call_store().kpis(date_range.start, date_range.end)
+        if kpis is None:
+            return None
+        return {
+            'Total Reports Analysed': kpis['calls'],
+            # The workbook shows effectiveness as a percentage
+            'Overall Sales Effectiveness': None if kpis['avg_score'] is None else round(kpis['avg_score'] * 10, 1),
+            'Total Duration': None if kpis['total_seconds'] is None else int(round(kpis['total_seconds'] / 60)),
+            'Average Duration': _minutes(kpis['avg_seconds'], 2),
+        }
+
+    df = load_workbook('monthly.xlsx')
+    if 'Period' not in df.columns:
+        raise ValueError("'Period' column not found in the data.")
+    df = df[df['Period'] == date_range.month_name]
+    if df.empty:
+        return None
+    row = df.iloc[0]
+    return {name: row.get(name) for name in
+            ['Total Reports Analysed', 'Overall Sales Effectiveness', 'Total Duration', 'Average Duration']}
+
+
+def mention_counts(kind, date_range, label):
+    # DataFrame of [label, 'Count'] for one mention list ('Products Discussed',
+    # 'Competitors', 'Competitor Products' or 'Pricing Concerns'); None when
+    # the workbook has no such column
+    if use_call_store():
+        rows = get_call_store().mention_counts(kind, date_range.start, date_range.end)
+        return pd.DataFrame(rows, columns=[label, 'Count'])
+
+    df = load_workbook('monthly.xlsx')
+    if kind not in df.columns:
+        return None
+    return count_mentions(df.loc[df['Period'] == date_range.month_name, kind], label)
+
+
+def mention_totals(date_range):
+    # Total mentions per list over a date range
+    if use_call_store():
+        store = get_call_store()
+        return {
+            kind: sum(count for _, count in store.mention_counts(kind, date_range.start, date_range.end))
+            for kind in MENTION_SOURCES
+        }
+
+    df = load_workbook('monthly.xlsx')
+    df = df[df['Period'] == date_range.month_name]
+    return {kind: total_mentions(df[kind]) if kind in df.columns else 0 for kind in MENTION_SOURCES}
+
+
+def _with_roster(df):
+    # Adds the roster's Team/Region columns, where the scores lack them
+    try:
+        roster = load_workbook(ROSTER_WORKBOOK)
+    except FileNotFoundError:
+        return df
+    columns = [col for col in COHORT_COLUMNS if col in roster.columns and col not in df.columns]
+    if 'SalesPerson' not in roster.columns or not columns:
+        return df
+    roster = roster[['SalesPerson'] + columns].drop_duplicates('SalesPerson')
+    return df.merge(roster, on='SalesPerson', how='left')
+
+
+def salesperson_scores():
+    # One row per salesperson in the individually.xlsx layout, plus Team and
+    # Region when known
+    if not use_call_store():
+        return _with_roster(load_workbook('individually.xlsx'))
+
+    rows = get_call_store().salesperson_summary()
+    columns = ['SalesPerson', 'Total Reports Analysed', 'Overall Sales Effectiveness', 'Total Duration',
+               'Average Duration'] + list(SCORE_COLUMNS.values())
+    records = []
+    for row in rows:
+        total_minutes = _minutes(row['total_seconds'], 1)
+        average_minutes = _minutes(row['avg_seconds'], 1)
+        records.append([
+            row['salesperson'],
+            row['calls'],
+            None if row['avg_score'] is None else round(row['avg_score'], 1),
+            None if total_minutes is None else f"{total_minutes} min",
+            None if average_minutes is None else f"{average_minutes} min",
+        ] + [None if row[name] is None else round(row[name], 1) for name in SCORE_FIELDS])
+    return _with_roster(pd.DataFrame(records, columns=columns))
+
+
+def dashboard_version():
+    # Changes whenever any data behind the dashboards does: a call is stored
+    # or deleted, or a workbook (including the roster) changes
+    return _once_per_render('dashboard_version', _dashboard_version)
+
+
+def _dashboard_version():
+    if use_call_store():
+        return f"calls-{get_call_store().revision()}-{data_version()}"
+    return data_version()
+
+
+def salesperson_cohorts():
+    # (scores, percentiles) for every rep, computed once per data version.
+    # percentiles maps each cohort (ALL_REPS, 'Team', 'Region') to a frame
+    # aligned with scores: each rep's percentile rank (0-100) within their
+    # cohort on every PERCENTILE_COLUMNS dimension. Ranks for all reps and
+    # dimensions come from one rank() per cohort, not a loop over reps.
+    global _cohorts
+    version = dashboard_version()
+    with _cohorts_lock:
+        if _cohorts is not None and _cohorts[0] == version:
+            return _cohorts[1]
+
+    scores = salesperson_scores().dropna(subset=['SalesPerson']).reset_index(drop=True)
+    values = scores.reindex(columns=PERCENTILE_COLUMNS).apply(pd.to_numeric, errors='coerce')
+    percentiles = {ALL_REPS: values.rank(pct=True) * 100}
+    for column in COHORT_COLUMNS:
+        if column in scores.columns:
+            percentiles[column] = values.groupby(scores[column]).rank(pct=True) * 100
+
+    with _cohorts_lock:
+        _cohorts = (version, (scores, percentiles))
+    return scores, percentiles
+
+
+def _split_list(values, name):
+    # One row per item of each comma-separated cell: the cell's row, the
+    # item's position in its list, and the item itself as name
+    items = values.astype(str).str.split(',').explode().str.strip()
+    return pd.DataFrame({
+        'row': items.index,
+        'position': items.groupby(level=0).cumcount().to_numpy(),
+        name: items.to_numpy(),
+    })
+
+
+def _competitor_pairs():
+    # (pairs, mismatches): one row per (product, competitor, reason) mention,
+    # and the products.xlsx rows whose competitor and reason lists differ in
+    # length (only their leading, paired entries are in pairs)
+    if use_call_store():
+        rows = get_call_store().competitor_reasons()
+        pairs = pd.DataFrame([(row['product'], row['brand'], row['category']) for row in rows], columns=CUBE_AXES)
+        return pairs, pd.DataFrame(columns=MISMATCH_COLUMNS)
+
+    df = load_workbook("products.xlsx")
+    if not all(col in df.columns for col in CUBE_AXES):
+        raise ValueError(f"Missing required columns. Expected: {CUBE_AXES}")
+
+    df = df.dropna(subset=CUBE_AXES)
+    competitors = _split_list(df['Potential Competitors'], 'Potential Competitors')
+    reasons = _split_list(df['Reason'], 'Reason')
+    # Competitors and reasons are matched by position in their lists
+    pairs = competitors.merge(reasons, on=['row', 'position'])
+    pairs.insert(0, 'Products', df.loc[pairs['row'], 'Products'].astype(str).str.strip().to_numpy())
+
+    lengths = pd.DataFrame({
+        'Competitors': competitors.groupby('row').size(),
+        'Reasons': reasons.groupby('row').size(),
+    })
+    lengths = lengths[lengths['Competitors'] != lengths['Reasons']]
+    mismatches = df.loc[lengths.index, CUBE_AXES].assign(
+        Competitors=lengths['Competitors'], Reasons=lengths['Reasons'],
+    )
+    # Header is row 1 of the sheet
+    mismatches.insert(0, 'Excel row', mismatches.index + 2)
+    return pairs[CUBE_AXES], mismatches.reset_index(drop=True)
+
+
+def competitor_reasons():
+    # One row per (product, competitor, reason) mention. Calls name the
+    # product a competitor won (Maida, Rava, ...), which is the same product
+    # line Naga sells under that name.
+    return _competitor_pairs()[0]
+
+
+def competitor_cube():
+    # (counts, mismatches), computed once per data version. counts is a
+    # Series of mentions indexed by CUBE_AXES and sorted, so slicing on any
+    # axis (counts.xs(value, level=axis)) is an index lookup rather than a
+    # pass over every mention. mismatches lists workbook rows whose
+    # competitor and reason lists differ in length.
+    global _cube
+    version = dashboard_version()
+    with _cube_lock:
+        if _cube is not None and _cube[0] == version:
+            return _cube[1]
+
+    pairs, mismatches = _competitor_pairs()
+    counts = pairs.groupby(CUBE_AXES).size().rename('Count').sort_index()
+
+    with _cube_lock:
+        _cube = (version, (counts, mismatches))
+    return counts, mismatches
+
+
+def product_concerns():
+    # One row per (Naga product, concern) mention
+    if use_call_store():
+        store = get_call_store()
+        rows = [(row['product'], row['category']) for row in store.competitor_reasons()]
+        rows += [(row['product'], 'Price Concern') for row in store.query("SELECT product FROM call_price_concerns")]
+        return pd.DataFrame(rows, columns=['Products', 'Concern'])
+
+    df = load_workbook("concerns.xlsx")
+    if "Products" not in df.columns or "Concerns" not in df.columns:
+        raise ValueError("Excel must contain 'Product' and 'Concerns' columns")
+    df = df.dropna(subset=["Products"])
+    concerns = df["Concerns"].map(str).str.split(",").explode().str.strip()
+    exploded = pd.DataFrame({'Products': df.loc[concerns.index, "Products"].to_numpy(), 'Concern': concerns.to_numpy()})
+    return exploded[exploded['Concern'] != ""]
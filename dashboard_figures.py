@@ -0,0 +1,334 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from dashboard_data import (
+    ALL_REPS, SCORE_COLUMNS, competitor_cube, competitor_reasons, dashboard_version, default_date_range,
+    mention_counts, mention_totals, product_concerns, salesperson_cohorts, salesperson_scores,
+)
+from mentions import categorize_scores, count_mentions
+
+
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", "64"))
+# Products whose charts are built at startup, most mentioned first
+PREWARM_TOP_PRODUCTS = int(os.getenv("FIGURE_PREWARM_PRODUCTS", "5"))
+
+# Mention list -> (label column, chart title, message when nothing was mentioned)
+TREEMAPS = {
+    'Products Discussed': ('Product', "Product Mention Rate", "No product discussion data found."),
+    'Competitors': ('Competitor', "Competitor Mention Rate", "No competitor data found."),
+    'Competitor Products': ('Product', "Competitor Product Preference", "No competitor product data found."),
+    'Pricing Concerns': ('Concern', "Products with Pricing Concerns", "No pricing concern data found."),
+}
+
+# Axes in SCORE_COLUMNS order, labelled with RADAR_CATEGORIES
+RADAR_COLUMNS = list(SCORE_COLUMNS.values())
+RADAR_CATEGORIES = ['Product Promotion Skill', 'Scheme Utilization', 'Competitor Handling Skill', 'Customer Understanding']
+
+# (rows, columns, where) the competitor heatmap opens on
+HEATMAP_DEFAULT = ('Potential Competitors', 'Products', None)
+
+
+class FigureCache:
+    """Bounded LRU of built figure specs keyed on (page, filters, data version)."""
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, page, filters, build, version=None):
+        # build() returns a figure dict (or a message string when there is
+        # nothing to draw); it runs only when the key isn't cached. A new data
+        # version makes every older entry unreachable, and LRU eviction drops
+        # them in time.
+        key = (page, filters, version or dashboard_version())
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = build()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_figure_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FigureCache()
+        return _default_cache
+
+
+def cached_figure(page, filters, build):
+    # filters: hashable tuple of everything the figure depends on besides data
+    return get_figure_cache().get_or_build(page, filters, build)
+
+
+# Builders: each returns fig.to_dict(), or a message string when there is
+# no chart to show. The spec is shared between sessions, so callers must
+# only read it.
+
+def mention_treemap(kind, date_range):
+    label, title, empty_message = TREEMAPS[kind]
+    freq_df = mention_counts(kind, date_range, label)
+    if freq_df is None:
+        return f"The column '{kind}' was not found in the Excel file."
+    if freq_df.empty:
+        return empty_message
+    fig = px.treemap(
+        freq_df,
+        path=[px.Constant(title), label],
+        values='Count',
+        color='Count',
+        color_continuous_scale='Blues',
+    )
+    fig.update_layout(
+        margin=dict(t=50, l=25, r=25, b=25),
+        uniformtext=dict(minsize=10, mode='hide')
+    )
+    return fig.to_dict()
+
+
+def performance_pie():
+    p_df = salesperson_scores()
+
+    # Count the number of people in each category
+    category_counts = categorize_scores(p_df['Overall Sales Effectiveness']).value_counts().reset_index()
+    category_counts.columns = ['Category', 'Count']
+
+    fig = px.pie(
+        category_counts,
+        names='Category',
+        values='Count',
+        color='Category',
+        color_discrete_map={
+            'Well': '#2ca02c',        # green
+            'Moderate': '#ffbf00',    # yellow
+            'Poor': '#d62728'         # red
+        },
+        height = 600
+    )
+    # Larger labels on the slices, with a thin border for visibility
+    fig.update_traces(
+        textfont_size=18,
+        marker=dict(line=dict(color='#000000', width=1))
+    )
+    fig.update_layout(
+        legend=dict(
+            font=dict(size=14)
+        )
+    )
+    return fig.to_dict()
+
+
+def discussion_summary_bar(date_range):
+    totals = mention_totals(date_range)
+    summary_data = pd.DataFrame({
+        'Category': list(TREEMAPS),
+        'Count': [totals.get(kind, 0) for kind in TREEMAPS],
+    })
+
+    fig = px.bar(
+        summary_data,
+        x='Category',
+        y='Count',
+        text='Count',
+        color='Count',
+        color_continuous_scale='Bluered',
+        height = 500
+    )
+    fig.update_traces(textposition='outside', textfont_size=15)
+    fig.update_layout(
+        xaxis_title="Discussion Category",
+        yaxis_title="Total Mentions",
+        template='simple_white',
+        yaxis=dict(showgrid=True, zeroline=False, title_font=dict(size=16), tickfont=dict(size=14)),
+        font = dict(size=14),
+        xaxis = dict(title_font=dict(size=16), tickfont=dict(size=14)),
+    )
+    return fig.to_dict()
+
+
+def salesperson_radar(selected, cohort):
+    # One trace per selected rep, over dashed medians of their cohort(s)
+    df, _ = salesperson_cohorts()
+    row_of = pd.Series(df.index, index=df['SalesPerson'].astype(str))
+    rows = row_of[~row_of.index.duplicated()][list(selected)].to_numpy()
+
+    fig = go.Figure()
+    if cohort == ALL_REPS:
+        cohort_groups = {"All reps (median)": df}
+    else:
+        cohort_groups = {
+            f"{value} (median)": df[df[cohort] == value]
+            for value in df.loc[rows, cohort].dropna().unique()
+        }
+    for label, members in cohort_groups.items():
+        medians = members[RADAR_COLUMNS].apply(pd.to_numeric, errors='coerce').median().tolist()
+        fig.add_trace(go.Scatterpolar(
+            r=medians + [medians[0]],
+            theta=RADAR_CATEGORIES + [RADAR_CATEGORIES[0]],
+            name=label,
+            line=dict(dash='dash', color='#7f7f7f'),
+        ))
+    for name, row in zip(selected, rows):
+        scores = pd.to_numeric(df.loc[row, RADAR_COLUMNS], errors='coerce').tolist()
+        trace = dict(r=scores + [scores[0]], theta=RADAR_CATEGORIES + [RADAR_CATEGORIES[0]], fill='toself', name=name)
+        if len(selected) == 1:
+            trace.update(line_color="#6873f9", fillcolor='rgba(164, 173, 248)')
+        else:
+            trace.update(opacity=0.6)
+        fig.add_trace(go.Scatterpolar(**trace))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0,10]), bgcolor='#e5ecf6',
+            angularaxis=dict(tickfont=dict(size=16))
+            ),
+        showlegend=True,
+        height = 600
+    )
+    return fig.to_dict()
+
+
+def competitor_reason_bar(product):
+    counts, _ = competitor_cube()
+    try:
+        count_df = counts.xs(product, level='Products').reset_index(name='Count')
+    except KeyError:
+        return f"No competitor data available for {product}."
+
+    count_df = count_df.sort_values(['Potential Competitors', 'Count'], ascending=[True, False])
+
+    fig = px.bar(
+        count_df,
+        x='Potential Competitors',
+        y='Count',
+        color='Reason',
+        title=f"Competitor Performance for {product}",
+        text='Count',
+        barmode='stack',
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        height=500
+    )
+    fig.update_traces(textposition='inside', textfont_size=15)
+    fig.update_layout(
+        xaxis_title="Potential Competitors",
+        yaxis_title="Count of Mentions",
+        legend_title="Reasons",
+        plot_bgcolor="#f9f9f9",
+        paper_bgcolor="#ffffff",
+        font=dict(size=13),
+        title_x=0.5,
+        xaxis = dict(title_font=dict(size=16), tickfont=dict(size=14), categoryorder='total descending'),
+        yaxis = dict(title_font=dict(size=16), tickfont=dict(size=14)),
+    )
+    return fig.to_dict()
+
+
+def competitor_heatmap(rows, columns, where=None):
+    # Mentions for every (rows, columns) pair of cube axes, summed over the
+    # third axis or limited to one value of it: where = (axis, value)
+    counts, _ = competitor_cube()
+    if where is not None:
+        axis, value = where
+        try:
+            counts = counts.xs(value, level=axis, drop_level=False)
+        except KeyError:
+            return f"No competitor data available for {value}."
+    matrix = counts.groupby(level=[rows, columns]).sum().unstack(fill_value=0)
+    if matrix.empty:
+        return "No competitor data found."
+    # Most mentioned first along both axes
+    matrix = matrix.loc[
+        matrix.sum(axis=1).sort_values(ascending=False).index,
+        matrix.sum().sort_values(ascending=False).index,
+    ]
+
+    fig = px.imshow(
+        matrix,
+        text_auto=True,
+        aspect='auto',
+        color_continuous_scale='Blues',
+        labels=dict(x=columns, y=rows, color='Mentions'),
+        height=max(400, 40 * len(matrix) + 150)
+    )
+    fig.update_layout(
+        font=dict(size=13),
+        xaxis=dict(title_font=dict(size=16), tickfont=dict(size=14), side='top'),
+        yaxis=dict(title_font=dict(size=16), tickfont=dict(size=14)),
+    )
+    return fig.to_dict()
+
+
+def concern_bar(product):
+    df = product_concerns()
+    concern_df = count_mentions(df.loc[df["Products"] == product, "Concern"], "Concern")
+
+    fig = px.bar(
+        concern_df,
+        x="Concern",
+        y="Count",
+        text="Count",
+        color="Concern",
+        color_discrete_sequence=px.colors.qualitative.Set2,
+        height=500
+    )
+    fig.update_traces(textposition="outside", textfont_size=15)
+    fig.update_layout(
+        xaxis_title="Concern Type",
+        yaxis_title="Frequency",
+        showlegend=True,
+        template="simple_white",
+        xaxis = dict(title_font=dict(size=16), tickfont=dict(size=14)),
+        yaxis = dict(title_font=dict(size=16), tickfont=dict(size=14))
+    )
+    return fig.to_dict()
+
+
+def _products_to_prewarm(products):
+    # The most mentioned products, plus the one each page opens on
+    products = products.dropna().astype(str)
+    if products.empty:
+        return []
+    top = products.value_counts().index[:PREWARM_TOP_PRODUCTS].tolist()
+    return list(dict.fromkeys([min(products)] + top))
+
+
+def prewarm():
+    # Builds the figures a fresh session sees first: the dashboards for the
+    # default period and the competitor/concern charts of the top products
+    date_range = default_date_range()
+    for kind in TREEMAPS:
+        cached_figure('dashboard', (kind, date_range), partial(mention_treemap, kind, date_range))
+    cached_figure('summary', ('performance',), performance_pie)
+    cached_figure('summary', ('discussion', date_range), partial(discussion_summary_bar, date_range))
+    cached_figure('competitor_heatmap', HEATMAP_DEFAULT, partial(competitor_heatmap, *HEATMAP_DEFAULT))
+    for product in _products_to_prewarm(competitor_reasons()['Products']):
+        cached_figure('competitors', (product,), partial(competitor_reason_bar, product))
+    for product in _products_to_prewarm(product_concerns()['Products']):
+        cached_figure('products', (product,), partial(concern_bar, product))
@@ -0,0 +1,106 @@
+import glob
+import hashlib
+import logging
+import os
+import threading
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+# Columnar copies of the workbooks, so a cold start skips openpyxl
+SIDECAR_DIR = os.getenv("DATA_SIDECAR_DIR", os.path.join("cache", "data"))
+
+_frames = {}
+_frames_lock = threading.Lock()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _sidecar_path(name, signature):
+    stem = os.path.splitext(name)[0]
+    return os.path.join(SIDECAR_DIR, f"{stem}.{signature}.parquet")
+
+
+def _parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _read_sidecar(path):
+    if not os.path.exists(path) or not _parquet_available():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.warning("Ignoring unreadable sidecar %s: %s", path, e)
+        return None
+
+
+def _write_sidecar(name, signature, df):
+    if not _parquet_available():
+        return
+    path = _sidecar_path(name, signature)
+    stem = os.path.splitext(name)[0]
+    try:
+        os.makedirs(SIDECAR_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # e.g. a column mixing numbers and text, which Parquet can't store
+        logger.warning("Could not write sidecar for %s: %s", name, e)
+        return
+    # Sidecars of older versions of the workbook are never read again
+    for old_path in glob.glob(os.path.join(SIDECAR_DIR, f"{glob.escape(stem)}.*.parquet")):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+def load_workbook(name):
+    # DataFrame for data/<name>, parsed once per process and re-read only when
+    # the file changes on disk. Callers get a shallow copy, so adding or
+    # replacing columns never touches the shared frame.
+    path = os.path.join(DATA_DIR, name)
+    signature = _signature(path)
+
+    with _frames_lock:
+        entry = _frames.get(name)
+        if entry is not None and entry[0] == signature:
+            return entry[1].copy(deep=False)
+
+    df = _read_sidecar(_sidecar_path(name, signature))
+    if df is None:
+        df = pd.read_excel(path)
+        _write_sidecar(name, signature, df)
+
+    with _frames_lock:
+        _frames[name] = (signature, df)
+    return df.copy(deep=False)
+
+
+def data_version(*names):
+    # Short token that changes whenever any of the named workbooks (default:
+    # every workbook in the data folder) changes; for keying derived caches
+    if names:
+        paths = [os.path.join(DATA_DIR, name) for name in names]
+    else:
+        paths = sorted(glob.glob(os.path.join(DATA_DIR, "*.xlsx")))
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            digest.update(f"{os.path.basename(path)}:{_signature(path)};".encode("utf-8"))
+        except OSError:
+            digest.update(f"{os.path.basename(path)}:missing;".encode("utf-8"))
+    return digest.hexdigest()[:16]
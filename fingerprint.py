@@ -0,0 +1,264 @@
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from audio_preprocess import FFMPEG_TIMEOUT_SECONDS, ffmpeg_available
+
+
+DEFAULT_DB_PATH = os.getenv("FINGERPRINT_DB", os.path.join("cache", "fingerprints.sqlite3"))
+# Two recordings match when their aligned sub-fingerprints differ in at most
+# this share of bits (re-encodes stay well below, different calls near 0.5)...
+MAX_BIT_ERROR_RATE = float(os.getenv("FINGERPRINT_MAX_BER", "0.30"))
+# ...over at least this share of the longer recording, so a short excerpt of a
+# call never gets the full call's report
+MIN_OVERLAP = float(os.getenv("FINGERPRINT_MIN_OVERLAP", "0.8"))
+
+SAMPLE_RATE = 8000
+FRAME_SIZE = 2048
+HOP_SIZE = 512
+BAND_COUNT = 33
+BAND_LOW_HZ = 300
+BAND_HIGH_HZ = 2000
+# Only ~1/16 of the sub-fingerprints are indexed, chosen by value (not
+# position) so a query samples the same ones as the stored copy whatever its
+# alignment. The value is mixed first: raw bits follow the spectrum and would
+# bias the sample.
+INDEX_SAMPLE_BITS = 4
+MAX_INDEXED_PER_RECORDING = 2000
+MAX_QUERY_HASHES = 2000
+MIN_VOTES = 3
+MAX_CANDIDATES = 5
+QUERY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    frames INTEGER NOT NULL,
+    fingerprint BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+-- Clustered on hash, so the table is its own lookup index
+CREATE TABLE IF NOT EXISTS fingerprint_hashes (
+    hash INTEGER NOT NULL,
+    recording_id INTEGER NOT NULL,
+    frame INTEGER NOT NULL,
+    PRIMARY KEY (hash, recording_id, frame)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reports (
+    recording_id INTEGER NOT NULL,
+    variant TEXT NOT NULL,
+    report TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (recording_id, variant)
+);
+"""
+
+
+def _numpy():
+    # numpy comes with pandas; without it dedupe is simply skipped
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def decode_pcm(audio_bytes):
+    # Mono 8 kHz 16-bit PCM via ffmpeg, or None if it can't be decoded
+    try:
+        completed = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+            input=bytes(audio_bytes), capture_output=True, check=True, timeout=FFMPEG_TIMEOUT_SECONDS,
+        )
+    except (subprocess.SubprocessError, OSError):
+        return None
+    return completed.stdout
+
+
+def fingerprint_pcm(pcm, np):
+    # One 32-bit sub-fingerprint per 64 ms hop: bit m is set when the energy
+    # difference between bands m and m+1 grew since the previous frame
+    # (Haitsma & Kalker). Robust to re-encoding, container and gain changes.
+    samples = np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype="<i2").astype(np.float32)
+    if len(samples) < FRAME_SIZE * 2:
+        return None
+
+    edges_hz = np.geomspace(BAND_LOW_HZ, BAND_HIGH_HZ, BAND_COUNT + 1)
+    edges = np.round(edges_hz * FRAME_SIZE / SAMPLE_RATE).astype(int)
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+
+    energies = []
+    # In chunks: a long call has tens of thousands of frames
+    for start in range(0, len(frames), 2000):
+        spectrum = np.abs(np.fft.rfft(frames[start:start + 2000] * window, axis=1)) ** 2
+        energies.append(np.add.reduceat(spectrum[:, edges[0]:edges[-1]], edges[:-1] - edges[0], axis=1))
+    energies = np.concatenate(energies)
+
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    weights = (1 << np.arange(31, -1, -1, dtype=np.uint64))
+    return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+
+def compute_fingerprint(audio_bytes):
+    # Returns a uint32 numpy array, or None when ffmpeg/numpy are missing or
+    # the audio is too short or undecodable
+    np = _numpy()
+    if np is None or not ffmpeg_available():
+        return None
+    pcm = decode_pcm(audio_bytes)
+    if not pcm:
+        return None
+    return fingerprint_pcm(pcm, np)
+
+
+def bit_error_rate(query, reference, offset, np):
+    # offset = reference frame - query frame for the same moment
+    query_start = max(0, -offset)
+    reference_start = max(0, offset)
+    length = min(len(query) - query_start, len(reference) - reference_start)
+    if length <= 0:
+        return 1.0, 0
+    diff = np.bitwise_xor(
+        query[query_start:query_start + length], reference[reference_start:reference_start + length],
+    )
+    return float(np.unpackbits(diff.view(np.uint8)).sum()) / (32 * length), length
+
+
+@dataclass
+class FingerprintMatch:
+    recording_id: int
+    bit_error_rate: float
+    offset_frames: int
+
+
+class FingerprintIndex:
+    """SQLite inverted index of audio fingerprints and the reports made for them."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _sampled(fingerprint, np, limit):
+        mixed = (fingerprint.astype(np.uint64) * 2654435761) & 0xFFFFFFFF
+        frames = np.flatnonzero(
+            (mixed >> (32 - INDEX_SAMPLE_BITS) == 0) & (fingerprint != 0) & (fingerprint != 0xFFFFFFFF)
+        )
+        if len(frames) > limit:
+            frames = frames[np.linspace(0, len(frames) - 1, limit).astype(int)]
+        return frames
+
+    def find(self, fingerprint):
+        # Best matching stored recording, or None
+        np = _numpy()
+        query_frames = self._sampled(fingerprint, np, MAX_QUERY_HASHES)
+        if not len(query_frames):
+            return None
+        frames_by_hash = {}
+        for frame in query_frames:
+            frames_by_hash.setdefault(int(fingerprint[frame]), []).append(int(frame))
+
+        # Vote on (recording, time offset): a true duplicate piles its votes
+        # on one offset, chance hash collisions spread out
+        votes = Counter()
+        hashes = list(frames_by_hash)
+        conn = self._connect()
+        try:
+            for start in range(0, len(hashes), QUERY_BATCH):
+                batch = hashes[start:start + QUERY_BATCH]
+                rows = conn.execute(
+                    "SELECT hash, recording_id, frame FROM fingerprint_hashes "
+                    f"WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for value, recording_id, frame in rows:
+                    for query_frame in frames_by_hash[value]:
+                        votes[(recording_id, frame - query_frame)] += 1
+
+            best = None
+            for (recording_id, offset), count in votes.most_common(MAX_CANDIDATES):
+                if count < MIN_VOTES:
+                    break
+                row = conn.execute(
+                    "SELECT fingerprint FROM recordings WHERE id = ?", (recording_id,)
+                ).fetchone()
+                reference = np.frombuffer(row[0], dtype="<u4")
+                ber, overlap = bit_error_rate(fingerprint, reference, offset, np)
+                if overlap < MIN_OVERLAP * max(len(fingerprint), len(reference)):
+                    continue
+                if ber <= MAX_BIT_ERROR_RATE and (best is None or ber < best.bit_error_rate):
+                    best = FingerprintMatch(recording_id, round(ber, 4), offset)
+            return best
+        finally:
+            conn.close()
+
+    def add(self, fingerprint):
+        np = _numpy()
+        indexed = self._sampled(fingerprint, np, MAX_INDEXED_PER_RECORDING)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO recordings (frames, fingerprint, created_at) VALUES (?, ?, ?)",
+                (len(fingerprint), fingerprint.astype("<u4").tobytes(), time.time()),
+            )
+            recording_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO fingerprint_hashes (hash, recording_id, frame) VALUES (?, ?, ?)",
+                [(int(fingerprint[frame]), recording_id, int(frame)) for frame in indexed],
+            )
+        return recording_id
+
+    def get_report(self, recording_id, variant):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT report FROM reports WHERE recording_id = ? AND variant = ?", (recording_id, variant)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_report(self, recording_id, variant, report):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports (recording_id, variant, report, created_at) VALUES (?, ?, ?, ?)",
+                (recording_id, variant, report, time.time()),
+            )
+
+    def stats(self):
+        with self._transaction() as conn:
+            recordings = conn.execute("SELECT COUNT(*) FROM recordings").fetchone()[0]
+            reports = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        return {"recordings": recordings, "reports": reports}
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_fingerprint_index():
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = FingerprintIndex()
+        return _default_index
@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from analyzer import analyze_audio
+from call_store import record_call
+from report_schema import render_report_markdown
+from telemetry import track_analysis
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("JOB_QUEUE_DB", os.path.join("cache", "jobs.sqlite3"))
+DEFAULT_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "2"))
+# A job still "running" after this long belongs to a worker that died
+STALE_AFTER_SECONDS = 15 * 60
+# Workers look for such jobs this often, so a job orphaned by a crash shortly
+# before a restart is picked up again once it goes stale
+REQUEUE_INTERVAL_SECONDS = 60
+# Pause after an unexpected error so a locked or broken database isn't hammered
+ERROR_BACKOFF_SECONDS = 5
+
+FINISHED_STATUSES = ('done', 'error')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    salesperson TEXT,
+    call_date TEXT,
+    audio BLOB,
+    result TEXT,
+    result_json TEXT,
+    partial_result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    first_token_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns returned to callers; the audio blob is only handed to workers
+JOB_COLUMNS = (
+    "id, status, filename, salesperson, call_date, result, result_json, partial_result, error, "
+    "created_at, started_at, first_token_at, finished_at"
+)
+# Streamed text is written back at most this often per job
+PARTIAL_WRITE_INTERVAL_SECONDS = 0.5
+
+
+class JobQueue:
+    """Persistent analysis job queue backed by SQLite, drained by a worker thread pool."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, handler=analyze_audio):
+        self.db_path = db_path
+        self.handler = handler
+        self._wakeup = threading.Event()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        self._requeue_lock = threading.Lock()
+        self._next_requeue_at = 0.0
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, audio_bytes, filename=None, salesperson=None, call_date=None):
+        # salesperson and call_date (ISO date) label the call in the call store
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, salesperson, call_date, audio, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, salesperson, call_date, sqlite3.Binary(bytes(audio_bytes)), time.time()),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def claim_next(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers (even
+        # in different processes) can never claim the same job
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, filename, salesperson, call_date, audio, created_at FROM jobs "
+                "WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            started_at = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                (started_at, row["id"]),
+            )
+            conn.commit()
+            return dict(row, started_at=started_at)
+        finally:
+            conn.close()
+
+    def complete(self, job_id, result, result_json=None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, result_json = ?, partial_result = NULL, "
+                "audio = NULL, finished_at = ? WHERE id = ?",
+                (result, result_json, time.time(), job_id),
+            )
+
+    def fail(self, job_id, error):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'error', error = ?, audio = NULL, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def update_partial(self, job_id, text, first_chunk=False):
+        with self._transaction() as conn:
+            if first_chunk:
+                conn.execute(
+                    "UPDATE jobs SET partial_result = ?, first_token_at = ? WHERE id = ?",
+                    (text, time.time(), job_id),
+                )
+            else:
+                conn.execute("UPDATE jobs SET partial_result = ? WHERE id = ?", (text, job_id))
+
+    def requeue_stale(self, stale_after=STALE_AFTER_SECONDS):
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, first_token_at = NULL, partial_result = NULL "
+                "WHERE status = 'running' AND started_at < ?",
+                (time.time() - stale_after,),
+            )
+        return cursor.rowcount
+
+    def _run_job(self, job):
+        last_write = {"at": None}
+
+        def on_chunk(text):
+            # Throttled so a fast stream doesn't turn into a write per token
+            now = time.monotonic()
+            first_chunk = last_write["at"] is None
+            if first_chunk or now - last_write["at"] >= PARTIAL_WRITE_INTERVAL_SECONDS:
+                self.update_partial(job["id"], text, first_chunk=first_chunk)
+                last_write["at"] = now
+
+        try:
+            with track_analysis(
+                "app",
+                job_id=job["id"],
+                filename=job["filename"],
+                upload_bytes=len(job["audio"] or b""),
+                queue_wait_seconds=round(job["started_at"] - job["created_at"], 3),
+            ) as record:
+                result = self.handler(job["audio"], on_chunk=on_chunk)
+        except Exception as e:
+            self.fail(job["id"], str(e))
+            return
+        try:
+            if isinstance(result, dict):
+                # Structured report: keep the JSON for ingest, markdown for display
+                self.complete(job["id"], render_report_markdown(result), json.dumps(result, ensure_ascii=False))
+            else:
+                self.complete(job["id"], result)
+        except Exception as e:
+            logger.warning("Could not store the result of job %s: %s", job["id"], e)
+            self.fail(job["id"], f"Could not store the result: {e}")
+            return
+        record_call(
+            result,
+            job["audio"],
+            filename=job["filename"],
+            salesperson=job["salesperson"],
+            call_date=job["call_date"],
+            duration_seconds=record.get("audio_seconds"),
+            model=record.get("model"),
+            recording_id=record.get("recording_id"),
+        )
+
+    def _requeue_if_due(self):
+        # Shared by all workers; only the first one past the deadline runs it
+        with self._requeue_lock:
+            now = time.monotonic()
+            if now < self._next_requeue_at:
+                return
+            self._next_requeue_at = now + REQUEUE_INTERVAL_SECONDS
+        requeued = self.requeue_stale()
+        if requeued:
+            logger.warning("Requeued %d stale analysis job(s)", requeued)
+
+    def _worker_loop(self):
+        while True:
+            try:
+                self._requeue_if_due()
+                job = self.claim_next()
+                if job is None:
+                    # Sleep until a submit wakes us, polling now and then for jobs
+                    # queued by other processes
+                    self._wakeup.wait(timeout=2)
+                    self._wakeup.clear()
+                    continue
+                self._run_job(job)
+            except Exception:
+                # A worker must outlive database errors, otherwise the pool
+                # quietly shrinks until nothing drains the queue
+                logger.exception("Analysis worker error")
+                time.sleep(ERROR_BACKOFF_SECONDS)
+
+    def start_workers(self, count=DEFAULT_WORKERS):
+        with self._workers_lock:
+            if self._workers:
+                return
+            for i in range(max(1, count)):
+                worker = threading.Thread(target=self._worker_loop, name=f"analysis-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    # Shared per process so the worker pool outlives individual script runs
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+            _default_queue.start_workers()
+        return _default_queue
@@ -0,0 +1,107 @@
+import importlib
+import logging
+import subprocess
+import sys
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Roughly when the process started serving: this module is among the first
+# the app imports
+PROCESS_START = time.time()
+
+# Modules the app loads on demand, in the order a cold start reaches them;
+# what `python lazy_imports.py` measures
+APP_MODULES = [
+    "streamlit",
+    "job_queue",
+    "google.generativeai",
+    "numpy",
+    "pandas",
+    "plotly.express",
+    "dashboard_data",
+    "dashboard_figures",
+    "docx",
+]
+
+_loads = {}
+_loads_lock = threading.Lock()
+_preloads = set()
+
+
+def load(name):
+    # importlib.import_module(name), recording what the first import in this
+    # process cost (including any dependencies it pulled in). Pages call this
+    # instead of importing heavy modules at the top of the app, so a module
+    # loads only when something first needs it.
+
+    # Always go through import_module: a module another thread is still
+    # importing is already in sys.modules, but only half initialized, and
+    # import_module waits for that import to finish
+    importing = name not in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    if not importing:
+        return module
+    seconds = time.perf_counter() - started
+    with _loads_lock:
+        if name not in _loads:
+            _loads[name] = {
+                "module": name,
+                "seconds": round(seconds, 4),
+                "loaded_at": round(time.time() - PROCESS_START, 2),
+                "thread": threading.current_thread().name,
+            }
+            logger.info("Loaded %s in %.3fs", name, seconds)
+    return module
+
+
+def import_report():
+    # One row per module loaded through load(), slowest first
+    with _loads_lock:
+        return sorted(_loads.values(), key=lambda row: row["seconds"], reverse=True)
+
+
+def _preload(name, then):
+    try:
+        module = load(name)
+        if then:
+            getattr(module, then)()
+    except Exception as e:
+        logger.warning("Preloading %s failed: %s", name, e)
+
+
+def preload(name, then=None):
+    # Once per process: loads name in a background thread, then calls its
+    # function `then` (e.g. to warm a cache), without holding up the page
+    with _loads_lock:
+        if (name, then) in _preloads:
+            return
+        _preloads.add((name, then))
+    threading.Thread(target=_preload, args=(name, then), name=f"preload-{name}", daemon=True).start()
+
+
+def cold_import_seconds(name):
+    # Import time of name in a fresh interpreter, i.e. on a cold start
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {name}; print(time.perf_counter() - started)"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        return None
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'module':<24} {'cold import':>12}")
+    for name in APP_MODULES:
+        seconds = cold_import_seconds(name)
+        print(f"{name:<24} {'failed' if seconds is None else f'{seconds:.3f}s':>12}")
+    print("\nFor a per-dependency breakdown: python -X importtime -c 'import <module>'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+
+def _weighted_mentions(values):
+    # (tokens, weights): every comma-separated mention of each distinct cell,
+    # stripped and without blanks, weighted by how many cells hold that value.
+    # Cells repeat a lot, so splitting only the distinct ones keeps the string
+    # work small however many rows there are.
+    # Tokens match str(value).split(",") per cell, so an empty cell counts as
+    # "nan", exactly as the dashboards always have. map(str) rather than
+    # astype(str), which keeps missing values missing on newer pandas.
+    cells = pd.Series(values, dtype=object).map(str)
+    codes, uniques = pd.factorize(cells)
+    cell_counts = np.bincount(codes, minlength=len(uniques))
+    tokens = pd.Series(uniques, dtype=object).str.split(",").explode().str.strip()
+    keep = (tokens != "").to_numpy()
+    weights = cell_counts[tokens.index.to_numpy()][keep]
+    return tokens[keep].to_numpy(), weights
+
+
+def count_mentions(values, label="Mention"):
+    # DataFrame of [label, 'Count'], most mentioned first; ties keep the order
+    # in which they were first mentioned
+    tokens, weights = _weighted_mentions(values)
+    counts = pd.Series(weights).groupby(tokens, sort=False).sum()
+    counts = counts.sort_values(ascending=False, kind="stable")
+    return pd.DataFrame({label: counts.index.astype(str), 'Count': counts.to_numpy()})
+
+
+def total_mentions(values):
+    return int(_weighted_mentions(values)[1].sum())
+
+
+def categorize_scores(scores):
+    # Over 8: Well, 6-8: Moderate, anything else (including blanks): Poor
+    scores = pd.to_numeric(pd.Series(scores), errors='coerce')
+    categories = np.select([scores > 8, scores >= 6], ['Well', 'Moderate'], default='Poor')
+    return pd.Series(categories, index=scores.index)
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from audio_preprocess import detect_container, probe_duration
+
+
+logger = logging.getLogger(__name__)
+
+# Pick the model per call instead of always using the default one
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "1") != "0"
+FAST_MODEL = os.getenv("ROUTER_FAST_MODEL", "gemini-2.5-flash")
+STRONG_MODEL = os.getenv("ROUTER_STRONG_MODEL", "gemini-2.5-pro")
+# Calls at least this long are sent to the strong model, if it fits the budgets
+STRONG_MIN_SECONDS = float(os.getenv("ROUTER_STRONG_MIN_SECONDS", str(15 * 60)))
+# Per-call budgets the strong model's estimate has to fit in
+LATENCY_BUDGET_SECONDS = float(os.getenv("ROUTER_LATENCY_BUDGET_SECONDS", "240"))
+COST_BUDGET_USD = float(os.getenv("ROUTER_COST_BUDGET_USD", "0.25"))
+# Retry on the strong model when the fast model's report is malformed
+ESCALATE_ON_INVALID = os.getenv("ROUTER_ESCALATE", "1") != "0"
+ROUTING_LOG_PATH = os.getenv("ROUTER_LOG_PATH", os.path.join("logs", "model_routing.jsonl"))
+
+# Rough per-model figures used for the budget estimates; tune them against
+# the routing log. Prices are USD per million tokens.
+MODEL_PROFILES = {
+    "gemini-2.5-flash": {
+        "input_price": 1.00,
+        "output_price": 2.50,
+        "base_seconds": 8.0,
+        "seconds_per_audio_minute": 1.0,
+    },
+    "gemini-2.5-pro": {
+        "input_price": 1.25,
+        "output_price": 10.00,
+        "base_seconds": 25.0,
+        "seconds_per_audio_minute": 4.0,
+    },
+}
+AUDIO_TOKENS_PER_SECOND = 32
+PROMPT_TOKENS = 4000
+OUTPUT_TOKENS = 2500
+
+# Used to estimate the duration from the file size when ffprobe is missing
+ESTIMATED_KBPS = {
+    'ogg': 24,
+    'webm': 32,
+    'mp3': 64,
+    'aac': 64,
+    'mp4': 64,
+}
+DEFAULT_KBPS = 64
+
+# Numbered sections every markdown report must contain. Headings count at any
+# level and with or without bold markers: "# 1.", "## **1. Conversation ...**"
+REQUIRED_SECTIONS = range(1, 10)
+_NUMBERED_HEADING = re.compile(r"^#+\s*(?:\*\*\s*)?(\d+)\.", re.MULTILINE)
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    reason: str
+    duration_seconds: float = None
+    # "ffprobe", "wav_header", "bitrate_estimate" or None
+    duration_source: str = None
+    estimated_seconds: float = None
+    estimated_cost_usd: float = None
+    escalated_from: str = None
+
+
+def estimate_duration(audio_bytes):
+    # Returns (seconds, source). ffprobe is exact; otherwise WAV headers carry
+    # the byte rate and compressed formats are guessed from a typical bitrate.
+    audio_bytes = bytes(audio_bytes)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "input")
+        with open(path, "wb") as f:
+            f.write(audio_bytes)
+        duration = probe_duration(path)
+    if duration is not None:
+        return duration, "ffprobe"
+
+    container = detect_container(audio_bytes)
+    if container == 'wav' and len(audio_bytes) >= 44:
+        byte_rate = int.from_bytes(audio_bytes[28:32], "little")
+        if byte_rate:
+            return (len(audio_bytes) - 44) / byte_rate, "wav_header"
+    if container in ('unknown', 'wav', 'flac', 'aiff'):
+        return None, None
+    kbps = ESTIMATED_KBPS.get(container, DEFAULT_KBPS)
+    return len(audio_bytes) * 8 / (kbps * 1000), "bitrate_estimate"
+
+
+def estimate_call(model_name, duration_seconds):
+    # (seconds, USD) for one analysis of a call this long on model_name
+    profile = MODEL_PROFILES.get(model_name)
+    if profile is None or duration_seconds is None:
+        return None, None
+    input_tokens = PROMPT_TOKENS + duration_seconds * AUDIO_TOKENS_PER_SECOND
+    cost = (input_tokens * profile["input_price"] + OUTPUT_TOKENS * profile["output_price"]) / 1_000_000
+    seconds = profile["base_seconds"] + duration_seconds / 60 * profile["seconds_per_audio_minute"]
+    return round(seconds, 1), round(cost, 4)
+
+
+def candidate_models(default_model=FAST_MODEL):
+    # Every model choose_model() can pick, so a cached report can be looked
+    # up before routing, which has to probe the audio
+    return [FAST_MODEL, STRONG_MODEL] if MODEL_ROUTING else [default_model]
+
+
+def choose_model(audio_bytes, default_model=FAST_MODEL):
+    # With routing off the audio isn't probed; callers that want the duration
+    # anyway (for telemetry) fill it in themselves
+    if not MODEL_ROUTING:
+        return RouteDecision(model=default_model, reason="routing disabled")
+
+    duration, source = estimate_duration(audio_bytes)
+    decision = RouteDecision(model=FAST_MODEL, reason="", duration_seconds=duration, duration_source=source)
+    strong_seconds, strong_cost = estimate_call(STRONG_MODEL, duration)
+
+    if duration is None:
+        decision.reason = "unknown duration"
+    elif duration < STRONG_MIN_SECONDS:
+        decision.reason = f"shorter than {STRONG_MIN_SECONDS:.0f}s"
+    elif strong_seconds is not None and strong_seconds > LATENCY_BUDGET_SECONDS:
+        decision.reason = f"{STRONG_MODEL} over latency budget ({strong_seconds}s > {LATENCY_BUDGET_SECONDS:.0f}s)"
+    elif strong_cost is not None and strong_cost > COST_BUDGET_USD:
+        decision.reason = f"{STRONG_MODEL} over cost budget (${strong_cost} > ${COST_BUDGET_USD})"
+    else:
+        decision.model = STRONG_MODEL
+        decision.reason = f"long call ({duration:.0f}s)"
+
+    decision.estimated_seconds, decision.estimated_cost_usd = estimate_call(decision.model, duration)
+    return decision
+
+
+def missing_sections(report_text):
+    found = {int(number) for number in _NUMBERED_HEADING.findall(report_text)}
+    return [f"# {number}." for number in REQUIRED_SECTIONS if number not in found]
+
+
+def escalate(decision, reason):
+    # Returns the decision to retry with, or None when there is nowhere to go
+    if not MODEL_ROUTING or not ESCALATE_ON_INVALID or decision.model == STRONG_MODEL:
+        return None
+    seconds, cost = estimate_call(STRONG_MODEL, decision.duration_seconds)
+    if cost is not None and cost > COST_BUDGET_USD:
+        logger.info("Not escalating to %s: over cost budget ($%s)", STRONG_MODEL, cost)
+        return None
+    return RouteDecision(
+        model=STRONG_MODEL,
+        reason=f"escalated: {reason}",
+        duration_seconds=decision.duration_seconds,
+        duration_source=decision.duration_source,
+        estimated_seconds=seconds,
+        estimated_cost_usd=cost,
+        escalated_from=decision.model,
+    )
+
+
+_log_lock = threading.Lock()
+
+
+def log_decision(decision, **outcome):
+    # One JSON line per routed request, with what actually happened (latency,
+    # tokens, status), so thresholds can be tuned against real throughput
+    record = {"ts": time.time(), **asdict(decision), **outcome}
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    logger.info("Model route: %s (%s)", decision.model, decision.reason)
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(ROUTING_LOG_PATH) or ".", exist_ok=True)
+            with open(ROUTING_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        logger.warning("Could not write routing log: %s", e)
@@ -0,0 +1,242 @@
+import glob
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from lazy_imports import load
+
+
+EXPORT_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join("cache", "exports"))
+# Oldest exports are removed past this many files
+MAX_EXPORT_FILES = int(os.getenv("EXPORT_CACHE_MAX_FILES", "200"))
+
+BULK_EXPORT_DIR = os.path.join(EXPORT_DIR, "bulk")
+# Bulk ZIPs are large; only the most recent few are kept
+MAX_BULK_EXPORTS = int(os.getenv("EXPORT_MAX_BULK_FILES", "10"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(min(8, os.cpu_count() or 4))))
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+ZIP_MIME = "application/zip"
+# Files a bulk export can contain, by extension
+BULK_FORMATS = {"docx": "Word", "md": "Markdown", "json": "JSON"}
+
+
+def report_hash(report_text):
+    return hashlib.sha256(report_text.encode("utf-8")).hexdigest()
+
+
+def _docx_path(report_text):
+    return os.path.join(EXPORT_DIR, f"{report_hash(report_text)}.docx")
+
+
+def _add_heading(doc, text, level, styles):
+    # doc.add_heading(text, level), with each level's style looked up by name
+    # once per document rather than on every heading
+    if level not in styles:
+        styles[level] = doc.styles["Title" if level == 0 else f"Heading {level}"]
+    return doc.add_paragraph(text, style=styles[level])
+
+
+def _add_line(doc, line, styles):
+    line = line.strip()
+    if not line:
+        return
+
+    # Check if it's a heading (starts with #)
+    if line.startswith('#'):
+        # Count the number of # to determine heading level
+        heading_level = len(line) - len(line.lstrip('#'))
+        heading_text = line.lstrip('#').strip()
+        if heading_text:
+            _add_heading(doc, heading_text, min(heading_level, 9), styles)
+    else:
+        # Handle regular paragraphs with bold formatting
+        paragraph = doc.add_paragraph()
+
+        # Split text by ** to handle bold formatting
+        for i, part in enumerate(line.split('**')):
+            if part:  # Only add non-empty parts
+                if i % 2 == 0:  # Even index = normal text
+                    paragraph.add_run(part)
+                else:  # Odd index = bold text
+                    paragraph.add_run(part).bold = True
+
+
+def write_docx(report_text, path):
+    # Converts the markdown report to a Word document at path. Lines are
+    # streamed from the text and the document is saved straight to disk, so
+    # no list of lines or in-memory copy of the .docx is held alongside it.
+    doc = load("docx").Document()
+    styles = {}
+    _add_heading(doc, 'Sales Performance Analysis Report', 0, styles)
+    for line in io.StringIO(report_text):
+        _add_line(doc, line, styles)
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    doc.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def cached_docx_path(report_text):
+    # Path of the report's Word export if it has been built, else None
+    path = _docx_path(report_text)
+    return path if os.path.exists(path) else None
+
+
+def _prune(pattern, keep):
+    paths = glob.glob(pattern)
+    if len(paths) <= keep:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def export_docx(report_text):
+    # Path of the report's Word export, building it the first time. Exports
+    # are keyed by a hash of the report text, so each report is converted at
+    # most once however many times (or by how many sessions) it is downloaded.
+    # Two sessions racing on one report both build it; the file is replaced
+    # atomically, so either copy is complete.
+    path = _docx_path(report_text)
+    if not os.path.exists(path):
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        write_docx(report_text, path)
+        _prune(os.path.join(EXPORT_DIR, "*.docx"), MAX_EXPORT_FILES)
+    return path
+
+
+def _safe_name(value):
+    return re.sub(r'[^\w\-. ]+', '_', str(value)).strip() or "_"
+
+
+def _arcname(call, extension):
+    # <salesperson>/<call date>_<file>_<id>.<ext>
+    stem = os.path.splitext(call.get('filename') or 'call')[0]
+    folder = _safe_name(call.get('salesperson') or 'Unassigned')
+    return f"{folder}/{call['call_date']}_{_safe_name(stem)}_{call['id']}.{extension}"
+
+
+def _submit_docx(executor, call, work_dir):
+    # (path, future) of a Word file for the call: the single-report export if
+    # one was built (future None), else a temporary one built in a worker
+    # process, so a bulk run doesn't flush that cache
+    cached = cached_docx_path(call['report_markdown'])
+    if cached is not None:
+        return cached, None
+    path = os.path.join(work_dir, f"{call['id']}.docx")
+    return path, executor.submit(write_docx, call['report_markdown'], path)
+
+
+_export_pools = {}
+_export_pools_lock = threading.Lock()
+
+
+def get_export_pool(workers=EXPORT_WORKERS):
+    # One pool per worker count, started on the first bulk export and reused
+    # by later ones. Workers are spawned rather than forked: forking the
+    # multi-threaded Streamlit server can copy a lock held by another thread
+    # into the child and deadlock it.
+    with _export_pools_lock:
+        pool = _export_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _export_pools[workers] = pool
+        return pool
+
+
+def _discard_export_pool(workers, pool):
+    # A worker died; the next export starts a fresh pool
+    with _export_pools_lock:
+        if _export_pools.get(workers) is pool:
+            del _export_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def write_bulk_zip(calls, path, formats=("docx",), progress=None, workers=EXPORT_WORKERS):
+    # Writes the reports of calls (dicts from CallStore.iter_calls) into a ZIP
+    # at path and returns how many calls were included. Building a Word file
+    # is pure-Python CPU work, so they are built in worker processes (threads
+    # would take turns on the GIL), with at most 2 x workers calls in flight.
+    # Each worker writes its file into a scratch directory; the file is then
+    # copied into the archive from disk and deleted. Memory and scratch space
+    # stay bounded by that window, not by the number of reports.
+    # progress(done) is called after each call.
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    work_dir = tempfile.mkdtemp(prefix="bulk-export-")
+    executor = get_export_pool(workers) if "docx" in formats else None
+    pending = deque()
+    written = 0
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            def write_next():
+                nonlocal written
+                call, docx_path, future = pending.popleft()
+                if docx_path is not None:
+                    if future is not None:
+                        future.result()
+                    archive.write(docx_path, _arcname(call, "docx"))
+                    if future is not None:
+                        os.remove(docx_path)
+                if "md" in formats:
+                    archive.writestr(_arcname(call, "md"), call['report_markdown'])
+                if "json" in formats and call.get('report_json'):
+                    archive.writestr(_arcname(call, "json"), call['report_json'])
+                written += 1
+                if progress:
+                    progress(written)
+
+            for call in calls:
+                if not call.get('report_markdown'):
+                    continue
+                docx_path = future = None
+                if "docx" in formats:
+                    docx_path, future = _submit_docx(executor, call, work_dir)
+                pending.append((call, docx_path, future))
+                if len(pending) >= 2 * workers:
+                    write_next()
+            while pending:
+                write_next()
+        os.replace(tmp_path, path)
+    except BrokenProcessPool:
+        _discard_export_pool(workers, executor)
+        raise
+    finally:
+        # The pool outlives this export; don't leave it building files for an
+        # archive that was abandoned
+        for _, _, future in pending:
+            if future is not None:
+                future.cancel()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
+
+
+def bulk_export(store, start=None, end=None, salesperson=None, formats=("docx",), progress=None):
+    # Path of a ZIP with every stored report dated start..end (of one
+    # salesperson, if given). The archive is reused until a call is added or
+    # removed, since the store's revision is part of its name.
+    formats = tuple(sorted(formats))
+    key = hashlib.sha256(repr((
+        store.db_path, store.revision(), start, end, salesperson, formats,
+    )).encode("utf-8")).hexdigest()[:24]
+    path = os.path.join(BULK_EXPORT_DIR, f"reports-{key}.zip")
+    if os.path.exists(path):
+        return path
+    os.makedirs(BULK_EXPORT_DIR, exist_ok=True)
+    write_bulk_zip(store.iter_calls(start, end, salesperson), path, formats=formats, progress=progress)
+    _prune(os.path.join(BULK_EXPORT_DIR, "*.zip"), MAX_BULK_EXPORTS)
+    return path
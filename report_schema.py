@@ -0,0 +1,444 @@
+import json
+import re
+
+
+COMPETITOR_CATEGORIES = ['Price Concern', 'Discount Concern', 'Product Variety', 'Product Package Size', 'Other factors']
+SCORE_FIELDS = ['product_promotion', 'scheme_leverage', 'competitor_handling', 'customer_psychology']
+# Weights from the scoring rubric in the analysis prompt
+SCORE_WEIGHTS = {
+    'product_promotion': 0.3,
+    'scheme_leverage': 0.2,
+    'competitor_handling': 0.25,
+    'customer_psychology': 0.25,
+}
+SCORE_LABELS = {
+    'product_promotion': 'Product promotion (30% weight)',
+    'scheme_leverage': 'Scheme leverage (20% weight)',
+    'competitor_handling': 'Competitor handling (25% weight)',
+    'customer_psychology': 'Customer psychology understanding (25% weight)',
+}
+
+
+def _string():
+    return {"type": "STRING"}
+
+
+def _strings():
+    return {"type": "ARRAY", "items": _string()}
+
+
+def _object(properties, required=None):
+    return {"type": "OBJECT", "properties": properties, "required": required or list(properties)}
+
+
+def _score():
+    # null means the criterion was N/A for this conversation
+    return {"type": "NUMBER", "nullable": True}
+
+
+# Gemini response_schema (OpenAPI subset) for the structured report
+RESPONSE_SCHEMA = _object({
+    "naga_products": _strings(),
+    "competitor_brands": {"type": "ARRAY", "items": _object({
+        "brand": _string(),
+        "products": _strings(),
+    })},
+    "conversation_summary": _strings(),
+    "products_promoted": {"type": "ARRAY", "items": _object({
+        "product": _string(),
+        "customer_response": _string(),
+        "outcome": {"type": "STRING", "enum": ["Accepted", "Rejected", "Undecided"]},
+    })},
+    "volume_upselling": _string(),
+    "schemes": {"type": "ARRAY", "items": _object({
+        "product": _string(),
+        "description": _string(),
+    })},
+    "cross_selling": _string(),
+    "objections": _strings(),
+    "competitor_advantages": _strings(),
+    "regular_buying_products": _strings(),
+    "scheme_based_products": _strings(),
+    "competitors": {"type": "ARRAY", "items": _object({
+        "brand": _string(),
+        "products": _strings(),
+        "current_status": _string(),
+        "reasons": _string(),
+        "category": {"type": "STRING", "enum": COMPETITOR_CATEGORIES},
+    })},
+    "online_retailers": {"type": "ARRAY", "items": _object({
+        "name": _string(),
+        "product_range": _string(),
+        "pricing_strategy": _string(),
+        "customer_perception": _string(),
+        "unique_selling_points": _string(),
+    })},
+    "buying_psychology": _object({
+        "purchase_drivers": _strings(),
+        "risk_tolerance": _string(),
+        "stock_rotation": _string(),
+        "openness_to_switching": _string(),
+        "buying_behaviour": _string(),
+    }),
+    "scores": _object({name: _score() for name in SCORE_FIELDS}),
+    "ability_analysis": _string(),
+    "price_concerns": {"type": "ARRAY", "items": _object({
+        "product": _string(),
+        "price_point": _string(),
+        "concern": _string(),
+    })},
+    "strengths": _strings(),
+    "improvements": _strings(),
+})
+
+JSON_OUTPUT_INSTRUCTIONS = """
+STRUCTURED OUTPUT
+
+Ignore the markdown TEMPLATE STRUCTURE above and return the same analysis as a
+single JSON object that matches the provided response schema. All other rules
+(brand identification, speaker context, scoring rubric) still apply.
+- Use null for a score whose criterion is N/A.
+- Competitor "category" must be one of: Price Concern, Discount Concern,
+  Product Variety, Product Package Size, Other factors.
+- Use empty lists when nothing was mentioned; never invent entries.
+"""
+
+
+class ReportValidationError(ValueError):
+    def __init__(self, problems):
+        super().__init__("Invalid analysis report: " + "; ".join(problems[:10]))
+        self.problems = problems
+
+
+def _check(value, schema, path, problems):
+    if value is None:
+        if not schema.get("nullable"):
+            problems.append(f"{path} is missing")
+        return
+    kind = schema["type"]
+    if kind == "OBJECT":
+        if not isinstance(value, dict):
+            problems.append(f"{path} should be an object")
+            return
+        for name in schema.get("required", []):
+            if name not in value:
+                problems.append(f"{path}.{name} is missing")
+        for name, sub_schema in schema["properties"].items():
+            if name in value:
+                _check(value[name], sub_schema, f"{path}.{name}", problems)
+    elif kind == "ARRAY":
+        if not isinstance(value, list):
+            problems.append(f"{path} should be a list")
+            return
+        for i, item in enumerate(value):
+            _check(item, schema["items"], f"{path}[{i}]", problems)
+    elif kind == "STRING":
+        if not isinstance(value, str):
+            problems.append(f"{path} should be text")
+        elif "enum" in schema and value not in schema["enum"]:
+            problems.append(f"{path} '{value}' is not one of {schema['enum']}")
+    elif kind == "NUMBER":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            problems.append(f"{path} should be a number")
+
+
+def validate_report(data):
+    # Accepts the raw model text or an already-decoded dict; returns the dict
+    if isinstance(data, (str, bytes)):
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            raise ReportValidationError([f"response is not valid JSON ({e})"])
+
+    problems = []
+    _check(data, RESPONSE_SCHEMA, "report", problems)
+    if not problems:
+        for name in SCORE_FIELDS:
+            score = data["scores"][name]
+            if score is not None and not 0 <= score <= 10:
+                problems.append(f"report.scores.{name} {score} is outside 0-10")
+    if problems:
+        raise ReportValidationError(problems)
+    return data
+
+
+def final_score(scores):
+    # N/A criteria get full marks, as the rubric in the prompt requires
+    return round(sum(
+        (10 if scores[name] is None else scores[name]) * weight
+        for name, weight in SCORE_WEIGHTS.items()
+    ), 2)
+
+
+SECTION_RULE = "\n------------------------------------------------------------\n"
+
+# Section of the 9-section report -> pattern its "# ..." heading starts with
+REPORT_SECTIONS = {
+    'mapping': r"Brand\s*&\s*Product Mapping",
+    'summary': r"1\.",
+    'sales': r"2\.",
+    'buying_patterns': r"3\.",
+    'competitors': r"4\.",
+    'scores': r"5\.",
+    'ability': r"6\.",
+    'prices': r"7\.",
+    'strengths': r"8\.",
+    'improvements': r"9\.",
+}
+# "# 1. ...", "## **1. ...**": any level, bold or not
+_HEADING = re.compile(r"^#+\s*(?:\*\*\s*)?(.*)$", re.MULTILINE)
+# A line that is only a horizontal rule, like the SECTION_RULE between sections
+_RULE_LINE = re.compile(r"^[ \t]*(?:-[ \t]*){3,}$\n?", re.MULTILINE)
+
+
+def _bullets(items, empty="None mentioned"):
+    items = [item for item in items if item]
+    if not items:
+        return f"- {empty}"
+    return "\n".join(f"- {item}" for item in items)
+
+
+def _join(items, empty="None"):
+    return ", ".join(items) if items else empty
+
+
+def render_report_markdown(data):
+    # Same 9-section layout the markdown prompt asks the model for
+    sections = []
+
+    sections.append("\n".join([
+        "# Brand & Product Mapping",
+        "",
+        "A. Naga Brand Products",
+        _bullets(data["naga_products"]),
+        "",
+        "B. Competitor Brands Mentioned",
+        _bullets([f"{c['brand']}: {_join(c['products'])}" for c in data["competitor_brands"]]),
+    ]))
+
+    sections.append("\n".join(["# 1. Conversation Summary", _bullets(data["conversation_summary"])]))
+
+    promoted = [f"{p['product']} ({p['outcome']}) - {p['customer_response']}" for p in data["products_promoted"]]
+    schemes = [f"{s['product']}: {s['description']}" for s in data["schemes"]]
+    accepted = [p["product"] for p in data["products_promoted"] if p["outcome"] == "Accepted"]
+    rejected = [p["product"] for p in data["products_promoted"] if p["outcome"] == "Rejected"]
+    sections.append("\n".join([
+        "# 2. Sales Matrix",
+        "",
+        "**Naga Products Performance**",
+        f"- Naga products promoted: {'; '.join(promoted) or 'None'}",
+        f"- Volume pushed / upselling: {data['volume_upselling'] or 'None'}",
+        f"- Schemes offered: {'; '.join(schemes) or 'None'}",
+        f"- Cross-selling within Naga portfolio: {data['cross_selling'] or 'None'}",
+        f"- Acceptance/Rejection: Accepted: {_join(accepted)}; Rejected: {_join(rejected)}",
+        "",
+        "**Sales Barriers**",
+        f"- Objections raised: {'; '.join(data['objections']) or 'None'}",
+        f"- Competitor advantages cited: {'; '.join(data['competitor_advantages']) or 'None'}",
+    ]))
+
+    sections.append("\n".join([
+        "# 3. Customer Buying Patterns",
+        "",
+        "A. Regularly buying products (Customer commits to buy BEFORE schemes OR shows clear intent regardless of schemes)",
+        "    " + _bullets(data["regular_buying_products"]).replace("\n", "\n    "),
+        "",
+        "B. Scheme Based Orders (Customer commits to buy ONLY BECAUSE schemes influenced their decision)",
+        "    " + _bullets(data["scheme_based_products"]).replace("\n", "\n    "),
+    ]))
+
+    competitor_lines = ["# 4. Competitive Intelligence & Customer Psychology", "", "A. Competitor Brand Analysis"]
+    if not data["competitors"]:
+        competitor_lines.append("- No competitor brands mentioned")
+    for i, competitor in enumerate(data["competitors"], start=1):
+        competitor_lines += [
+            "",
+            f"**Brand {i}:**",
+            f"- Brand Name: {competitor['brand']}",
+            f"- Products: {_join(competitor['products'])}",
+            f"- Customer's Current Status: {competitor['current_status']}",
+            f"- Reasons for Preference: {competitor['reasons']}",
+            f"- Category: {competitor['category']}",
+        ]
+    competitor_lines += ["", "B. Online Retailers Mentioned"]
+    if not data["online_retailers"]:
+        competitor_lines.append("- None mentioned")
+    for i, retailer in enumerate(data["online_retailers"], start=1):
+        competitor_lines += [
+            f"**Retailer {i}:**",
+            f"- Name: {retailer['name']}",
+            f"- Product Range: {retailer['product_range']}",
+            f"- Pricing Strategy: {retailer['pricing_strategy']}",
+            f"- Customer Perception: {retailer['customer_perception']}",
+            f"- Unique Selling Points: {retailer['unique_selling_points']}",
+            "",
+        ]
+    psychology = data["buying_psychology"]
+    competitor_lines += [
+        "",
+        "C. Customer Buying Psychology",
+        f"- What truly drives purchase decisions: {_join(psychology['purchase_drivers'])}",
+        f"- Customer's risk tolerance: {psychology['risk_tolerance']}",
+        f"- Stock rotation preferences: {psychology['stock_rotation']}",
+        f"- Openness to switching brands: {psychology['openness_to_switching']}",
+        f"- How is the customer buying behaviour: {psychology['buying_behaviour']}",
+    ]
+    sections.append("\n".join(competitor_lines))
+
+    scores = data["scores"]
+    score_lines = ["# 5. Salesperson Effectiveness Score", ""]
+    for name in SCORE_FIELDS:
+        value = "N/A (10)" if scores[name] is None else f"{scores[name]:g}"
+        score_lines.append(f"**{SCORE_LABELS[name]}:** {value}/10")
+    formula = " + ".join(
+        f"({10 if scores[name] is None else scores[name]:g} × {SCORE_WEIGHTS[name]:g})" for name in SCORE_FIELDS
+    )
+    score_lines += ["", "**Final Score Calculation:**", f"{formula} = {final_score(scores):g}/10"]
+    sections.append("\n".join(score_lines))
+
+    sections.append("\n".join(["# 6. Salesperson Ability Analysis", f"- {data['ability_analysis']}"]))
+
+    sections.append("\n".join([
+        "# 7. Product Price Analysis",
+        _bullets(
+            [f"{c['product']} ({c['price_point']}): {c['concern']}" for c in data["price_concerns"]],
+            empty="No high-price concerns raised for Naga products",
+        ),
+    ]))
+
+    sections.append("\n".join(["# 8. Salesperson Strengths", _bullets(data["strengths"])]))
+    sections.append("\n".join(["# 9. Areas for Improvement", _bullets(data["improvements"])]))
+
+    return SECTION_RULE.join(f"\n{section}\n" for section in sections).strip() + "\n"
+
+
+def _section(text, heading_pattern):
+    # Body of the "# ..." section whose heading matches, up to the next one
+    match = re.search(rf"^#+\s*(?:\*\*\s*)?{heading_pattern}.*$", text, re.MULTILINE | re.IGNORECASE)
+    if match is None:
+        return ""
+    following = re.search(r"^#+\s", text[match.end():], re.MULTILINE)
+    end = match.end() + following.start() if following else len(text)
+    return text[match.end():end]
+
+
+def split_report_sections(text, with_headings=True):
+    # {section: text} over REPORT_SECTIONS plus 'other', which gets whatever
+    # falls under no known heading (e.g. a report in a different layout), so
+    # every line of the report lands in exactly one section. Without
+    # headings, the known sections' own heading lines and the rules between
+    # sections are left out.
+    sections = dict.fromkeys(list(REPORT_SECTIONS) + ['other'], "")
+    headings = list(_HEADING.finditer(text))
+    parts = [('other', text[:headings[0].start()] if headings else text)]
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        name = next(
+            (name for name, pattern in REPORT_SECTIONS.items()
+             if re.match(pattern, heading.group(1), re.IGNORECASE)),
+            'other',
+        )
+        start = heading.end() if name != 'other' and not with_headings else heading.start()
+        parts.append((name, text[start:end]))
+    for name, part in parts:
+        sections[name] += part if with_headings else _RULE_LINE.sub("", part)
+    return sections
+
+
+def _section_bullets(text):
+    bullets = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(("- ", "* ")):
+            bullets.append(line[2:].strip())
+    return bullets
+
+
+def _split_list(value):
+    return [item.strip(" *") for item in re.split(r"[,;]", value) if item.strip(" *")]
+
+
+def _field(bullet):
+    # "Brand Name: Aachi" -> ("Brand Name", "Aachi"). Models often bold the
+    # label ("**Brand Name:** Aachi", "**Aachi**: ..."), so the markers are
+    # stripped from both sides of the colon.
+    name, _, value = bullet.partition(":")
+    return name.strip(" *"), value.strip(" *")
+
+
+def _is_none(value):
+    return not value or value.strip().lower().rstrip(".") in (
+        "none", "none mentioned", "n/a", "na", "not mentioned", "not discussed",
+    )
+
+
+def parse_report_markdown(text):
+    # Best-effort extraction of the facts the dashboards need from a markdown
+    # report in the 9-section format. Returns a dict using the same keys as
+    # RESPONSE_SCHEMA (only naga_products, competitor_brands, competitors,
+    # schemes, price_concerns and scores); missing parts come back empty.
+    mapping = _section(text, r"Brand\s*&\s*Product Mapping")
+    naga_part, _, competitor_part = mapping.partition("B. Competitor")
+    naga_products = [p.strip(" *") for p in _section_bullets(naga_part) if not _is_none(p.strip(" *"))]
+
+    competitor_brands = []
+    for bullet in _section_bullets(competitor_part):
+        brand, products = _field(bullet)
+        if not _is_none(brand):
+            competitor_brands.append({"brand": brand, "products": _split_list(products)})
+
+    competitors = []
+    analysis = _section(text, r"4\.")
+    analysis = re.split(r"^\s*B\. Online Retailers", analysis, flags=re.MULTILINE)[0]
+    for block in re.split(r"\*\*Brand \d+:?\*\*:?", analysis)[1:]:
+        fields = {}
+        for bullet in _section_bullets(block):
+            name, value = _field(bullet)
+            fields[name.lower()] = value
+        brand = fields.get("brand name", "")
+        if _is_none(brand):
+            continue
+        category = fields.get("category", "")
+        if category not in COMPETITOR_CATEGORIES:
+            category = next((c for c in COMPETITOR_CATEGORIES if c.lower() in category.lower()), "Other factors")
+        competitors.append({
+            "brand": brand,
+            "products": _split_list(fields.get("products", "")),
+            "current_status": fields.get("customer's current status", ""),
+            "reasons": fields.get("reasons for preference", ""),
+            "category": category,
+        })
+
+    schemes = []
+    offered = re.search(
+        r"^\s*[-*]\s*(?:\*\*)?Schemes offered:?(?:\*\*)?:?\s*(.+)$", _section(text, r"2\."), re.MULTILINE,
+    )
+    if offered and not _is_none(offered.group(1)):
+        for item in offered.group(1).split(";"):
+            product, description = _field(item)
+            if description:
+                schemes.append({"product": product, "description": description})
+            elif product:
+                schemes.append({"product": "", "description": product})
+
+    price_concerns = []
+    for bullet in _section_bullets(_section(text, r"7\.")):
+        product = next((p for p in naga_products if bullet.lstrip(" *").lower().startswith(p.lower())), None)
+        if product is not None:
+            price_concerns.append({"product": product, "price_point": "", "concern": bullet})
+
+    scores = {}
+    score_section = _section(text, r"5\.")
+    for name, label in SCORE_LABELS.items():
+        short_label = re.escape(label.split(" (")[0])
+        match = re.search(rf"\*\*{short_label}[^*]*:?\*\*:?\s*([\d.]+|N/?A)", score_section, re.IGNORECASE)
+        scores[name] = float(match.group(1)) if match and match.group(1)[0].isdigit() else None
+
+    return {
+        "naga_products": naga_products,
+        "competitor_brands": competitor_brands,
+        "competitors": competitors,
+        "schemes": schemes,
+        "price_concerns": price_concerns,
+        "scores": scores,
+    }
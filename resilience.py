@@ -0,0 +1,203 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from backends import AnalysisBackend, BackendError
+
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+@dataclass
+class RetryPolicy:
+    # Defaults are read from the environment when a policy is created, so a
+    # .env file loaded by create_backend() applies
+    max_attempts: int = field(default_factory=lambda: int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "4")))
+    # Per-attempt wall-clock limit, including a streamed reply
+    timeout: float = field(default_factory=lambda: _env_float("ANALYSIS_TIMEOUT_SECONDS", 300.0))
+    backoff_base: float = field(default_factory=lambda: _env_float("ANALYSIS_BACKOFF_BASE_SECONDS", 1.0))
+    backoff_max: float = field(default_factory=lambda: _env_float("ANALYSIS_BACKOFF_MAX_SECONDS", 30.0))
+    # Send a duplicate request if the first hasn't finished after this many
+    # seconds and keep whichever finishes first. None disables hedging.
+    hedge_after: float = field(default_factory=lambda: _env_float("ANALYSIS_HEDGE_AFTER_SECONDS", None))
+
+    def backoff(self, attempt):
+        # "Full jitter": random delay up to the exponential cap, so clients
+        # that failed together don't retry together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class RequestTimeout(BackendError):
+    def __init__(self, seconds):
+        super().__init__(f"Analysis request timed out after {seconds:.0f}s", status_code=504)
+
+
+class CircuitOpenError(BackendError):
+    def __init__(self, retry_in=None):
+        if retry_in is None:
+            message = "Analysis service is failing; waiting for a trial request to succeed"
+        else:
+            message = f"Analysis service is failing; not sending requests for another {retry_in:.0f}s"
+        super().__init__(message, status_code=503)
+
+
+def is_retryable(error):
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # BackendError.status_code, or google.api_core's GoogleAPICallError.code
+    status = getattr(error, "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code
+    return status in RETRYABLE_STATUS_CODES
+
+
+class CircuitBreaker:
+    """Stops calling the API after repeated failures, then lets one trial request through."""
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+        self.reset_timeout = reset_timeout or _env_float("BREAKER_RESET_SECONDS", 60.0)
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        # Half open: whether the one trial request is still running
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+                if retry_in > 0:
+                    raise CircuitOpenError(retry_in)
+                # Cool-down over: allow a trial request through
+                self.state = "half_open"
+            if self.state == "half_open":
+                # Everyone else fails fast until the trial has an outcome
+                if self._trial_in_flight:
+                    raise CircuitOpenError()
+                self._trial_in_flight = True
+
+    def release_trial(self):
+        # The trial ended without telling whether the service is healthy
+        # (e.g. a non-retryable error); the next caller becomes the trial
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._trial_in_flight = False
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuit breaker opened after %d failures", self._failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ResilientBackend(AnalysisBackend):
+    """Wraps a backend with timeouts, retries with backoff, a circuit breaker and hedging."""
+
+    def __init__(self, backend, policy=None, breaker=None, max_concurrency=32):
+        self.backend = backend
+        self.name = backend.name
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="analysis-request")
+
+    def analyze(self, prompt, audio_bytes, mime_type="audio/mp3", model_name=None, context=None,
+                response_schema=None, on_chunk=None):
+        def request(chunk_callback):
+            return self.backend.analyze(
+                prompt, audio_bytes, mime_type, model_name,
+                context=context, response_schema=response_schema, on_chunk=chunk_callback,
+            )
+        return self._call(request, on_chunk)
+
+    def generate_text(self, prompt, model_name=None, response_schema=None):
+        def request(chunk_callback):
+            return self.backend.generate_text(prompt, model_name, response_schema=response_schema)
+        return self._call(request, None)
+
+    def _call(self, request, on_chunk):
+        for attempt in range(self.policy.max_attempts):
+            self.breaker.before_call()
+            try:
+                response = self._attempt(request, on_chunk)
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release_trial()
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 >= self.policy.max_attempts:
+                    raise
+                delay = self.policy.backoff(attempt)
+                logger.info("Attempt %d failed (%s), retrying in %.1fs", attempt + 1, e, delay)
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return response
+
+    def _attempt(self, request, on_chunk):
+        decided = threading.Event()
+
+        def primary_chunks(text):
+            # Once a hedge has won, late chunks from the primary are dropped
+            if not decided.is_set():
+                on_chunk(text)
+
+        deadline = time.monotonic() + self.policy.timeout
+        primary = self._executor.submit(request, primary_chunks if on_chunk else None)
+        futures = [primary]
+
+        hedge_after = self.policy.hedge_after
+        if hedge_after is not None and hedge_after < self.policy.timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                logger.info("No reply after %.1fs, sending a hedged request", hedge_after)
+                futures.append(self._executor.submit(request, None))
+
+        error = None
+        while futures:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                decided.set()
+                raise RequestTimeout(self.policy.timeout)
+            done, _ = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                decided.set()
+                response = future.result()
+                if on_chunk is not None and future is not primary:
+                    on_chunk(response.text)
+                return response
+        raise error
+
+
+def with_resilience(backend):
+    if isinstance(backend, ResilientBackend):
+        return backend
+    return ResilientBackend(backend)
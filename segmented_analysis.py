@@ -0,0 +1,156 @@
+import os
+import re
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_preprocess import (
+    FFMPEG_TIMEOUT_SECONDS,
+    TARGET_MIME_TYPE,
+    encode_speech,
+    ffmpeg_available,
+    probe_duration,
+)
+
+
+# Calls at least this long are split; shorter ones go out as a single request
+LONG_CALL_MIN_SECONDS = float(os.getenv("LONG_CALL_MIN_SECONDS", str(20 * 60)))
+SEGMENT_SECONDS = float(os.getenv("SEGMENT_SECONDS", str(5 * 60)))
+# Neighbouring segments share this much audio so no sentence is lost at a cut
+SEGMENT_OVERLAP_SECONDS = float(os.getenv("SEGMENT_OVERLAP_SECONDS", "15"))
+# How far from the ideal boundary we look for a pause to cut at
+PAUSE_SEARCH_SECONDS = 60.0
+PAUSE_MIN_SECONDS = 0.6
+PAUSE_THRESHOLD_DB = -35
+SEGMENT_WORKERS = int(os.getenv("SEGMENT_WORKERS", "6"))
+
+SEGMENT_CONTEXT = """
+SEGMENT CONTEXT
+
+This audio is part {index} of {count} of one longer sales visit
+({start} to {end} of the full recording). Neighbouring parts overlap by a few
+seconds. Analyze ONLY what is said in this part, using the format above. If a
+section has no evidence in this part, write "Not discussed in this part" and
+score that criterion as N/A.
+"""
+
+MERGE_PROMPT = """
+You are given {count} partial analysis reports of ONE sales visit. Each report
+covers a consecutive part of the same recording, in order, and neighbouring
+parts overlap slightly, so the same statement may appear twice.
+
+Combine them into ONE report for the whole visit:
+- Brand & Product Mapping: union of all Naga products and competitor brands, each listed once
+- Schemes, objections, competitor advantages and price concerns: keep every distinct item, drop duplicates caused by the overlap
+- Customer Buying Patterns: a product that was scheme-based in any part stays scheme-based
+- Competitor Brand Analysis: one entry per competitor brand, merging the reasons; keep the Category values from the fixed list
+- Scores: re-score each criterion for the whole visit from the evidence in all parts (N/A only if it is N/A in every part), then recompute the final score with the same weights
+- Conversation Summary: 3-5 points covering the whole visit in order
+
+Do not mention parts or segments in the output. Start directly with the report.
+
+{output_format}
+
+------------------------------------------------------------
+PARTIAL REPORTS
+"""
+
+
+def _timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def find_pauses(audio_path):
+    # ffmpeg's silencedetect prints "silence_start: x" / "silence_end: y" to stderr
+    completed = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+            "-af", f"silencedetect=noise={PAUSE_THRESHOLD_DB}dB:d={PAUSE_MIN_SECONDS}",
+            "-f", "null", "-",
+        ],
+        capture_output=True, text=True, timeout=FFMPEG_TIMEOUT_SECONDS,
+    )
+    starts = [float(v) for v in re.findall(r"silence_start: (-?[\d.]+)", completed.stderr)]
+    ends = [float(v) for v in re.findall(r"silence_end: ([\d.]+)", completed.stderr)]
+    return list(zip(starts, ends))
+
+
+def plan_segments(duration, pauses, segment_seconds=SEGMENT_SECONDS, overlap=SEGMENT_OVERLAP_SECONDS):
+    # Returns (start, end) pairs covering the whole call. Each cut is moved to
+    # the middle of the nearest pause around the ideal boundary, if any.
+    pause_midpoints = [(start + end) / 2 for start, end in pauses]
+    segments = []
+    start = 0.0
+    while duration - start > segment_seconds * 1.25:
+        ideal = start + segment_seconds
+        nearby = [p for p in pause_midpoints if abs(p - ideal) <= PAUSE_SEARCH_SECONDS and p > start + overlap]
+        cut = min(nearby, key=lambda p: abs(p - ideal)) if nearby else ideal
+        segment_start = start - overlap if segments else 0.0
+        segments.append((max(0.0, segment_start), cut + overlap))
+        start = cut
+    segment_start = start - overlap if segments else 0.0
+    segments.append((max(0.0, segment_start), duration))
+    return segments
+
+
+def analyze_segmented(audio_bytes, backend, prompt, output_format, model_name, max_workers=SEGMENT_WORKERS,
+                      on_usage=None):
+    # Returns the merged report text, or None when the call is short enough
+    # (or ffmpeg missing) and should be analyzed in one request instead.
+    # on_usage(usage, seconds, first_token_seconds) is called for every
+    # request (each segment and the merge) from the calling thread, so
+    # thread-local accounting such as the telemetry record sees all of them.
+    if not ffmpeg_available():
+        return None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "input")
+        with open(input_path, "wb") as f:
+            f.write(audio_bytes)
+
+        duration = probe_duration(input_path)
+        if duration is None or duration < LONG_CALL_MIN_SECONDS:
+            return None
+
+        segments = plan_segments(duration, find_pauses(input_path))
+
+        def analyze_segment(item):
+            index, (start, end) = item
+            segment_path = os.path.join(tmp_dir, f"segment_{index}.ogg")
+            encode_speech(input_path, segment_path, start=start, duration=end - start)
+            with open(segment_path, "rb") as f:
+                segment_audio = f.read()
+            # The static prompt stays identical across segments (and calls) so
+            # it can be served from the context cache; only this note varies
+            segment_context = SEGMENT_CONTEXT.format(
+                index=index + 1,
+                count=len(segments),
+                start=_timestamp(start),
+                end=_timestamp(end),
+            )
+            started_at = time.perf_counter()
+            response = backend.analyze(prompt, segment_audio, TARGET_MIME_TYPE, model_name, context=segment_context)
+            return response, time.perf_counter() - started_at
+
+        # Map: every segment in parallel, so wall time tracks the slowest
+        # segment rather than the call length
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segments)))) as pool:
+            responses = list(pool.map(analyze_segment, enumerate(segments)))
+
+    if on_usage is not None:
+        for response, seconds in responses:
+            on_usage(response.usage, seconds, response.first_token_seconds)
+    partial_reports = [response.text for response, _ in responses]
+
+    # Reduce: one text-only request folds the parts into the standard report
+    merge_prompt = MERGE_PROMPT.format(count=len(partial_reports), output_format=output_format)
+    for index, report in enumerate(partial_reports):
+        start, end = segments[index]
+        merge_prompt += f"\n\n=== PART {index + 1} ({_timestamp(start)}-{_timestamp(end)}) ===\n\n{report}"
+    started_at = time.perf_counter()
+    merged = backend.generate_text(merge_prompt, model_name)
+    if on_usage is not None:
+        on_usage(merged.usage, time.perf_counter() - started_at)
+    return merged.text
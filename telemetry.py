@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+# Append-only JSON lines log with one record per analysis
+TELEMETRY_LOG_PATH = os.getenv("TELEMETRY_LOG_PATH", os.path.join("logs", "analyses.jsonl"))
+
+USAGE_FIELDS = ("prompt_tokens", "audio_tokens", "output_tokens", "cached_tokens")
+
+_current = threading.local()
+_write_lock = threading.Lock()
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile; None for no values
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def track_analysis(source, **fields):
+    # Collects one record for the analysis run inside the block. Code further
+    # down (analyzer, router) adds to it with annotate()/add_usage() from the
+    # same thread. The record is written when the block exits, also on errors.
+    record = {
+        "ts": time.time(),
+        "source": source,
+        "status": "ok",
+        "error_class": None,
+        "cache_hit": False,
+        "requests": 0,
+        "model_seconds": 0.0,
+        **{name: 0 for name in USAGE_FIELDS},
+        **fields,
+    }
+    previous = getattr(_current, "record", None)
+    _current.record = record
+    started_at = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["status"] = "error"
+        record["error_class"] = type(e).__name__
+        raise
+    finally:
+        _current.record = previous
+        record["analysis_seconds"] = round(time.perf_counter() - started_at, 3)
+        record["model_seconds"] = round(record["model_seconds"], 3)
+        write_record(record)
+
+
+def annotate(**fields):
+    # No-op outside track_analysis(), e.g. when the analyzer is used directly
+    record = getattr(_current, "record", None)
+    if record is not None:
+        record.update(fields)
+
+
+def add_usage(usage, seconds, first_token_seconds=None):
+    # Called once per model request; escalations and retries add up
+    record = getattr(_current, "record", None)
+    if record is None:
+        return
+    record["requests"] += 1
+    record["model_seconds"] += seconds
+    for name in USAGE_FIELDS:
+        record[name] += usage.get(name) or 0
+    if record.get("first_token_seconds") is None and first_token_seconds is not None:
+        record["first_token_seconds"] = round(first_token_seconds, 3)
+
+
+def write_record(record, path=None):
+    path = path or TELEMETRY_LOG_PATH
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        # Telemetry must never fail an analysis
+        logger.warning("Could not write telemetry record: %s", e)
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_records(path=None, since=None):
+    # Parsed records, re-read only when the file has changed on disk
+    path = path or TELEMETRY_LOG_PATH
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return []
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _loaded_lock:
+        entry = _loaded.get(path)
+        if entry is None or entry[0] != signature:
+            records = []
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash mid-write
+                        continue
+            entry = (signature, records)
+            _loaded[path] = entry
+        records = entry[1]
+
+    if since is not None:
+        records = [r for r in records if r.get("ts", 0) >= since]
+    return records
+
+
+def summarize(records):
+    analyses = len(records)
+    errors = sum(1 for r in records if r.get("status") == "error")
+    latencies = [r.get("analysis_seconds") for r in records if r.get("status") == "ok"]
+    span = max(r["ts"] for r in records) - min(r["ts"] for r in records) if records else 0
+    return {
+        "analyses": analyses,
+        "errors": errors,
+        "error_rate": errors / analyses if analyses else 0.0,
+        "cache_hit_rate": sum(1 for r in records if r.get("cache_hit")) / analyses if analyses else 0.0,
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+        "p99_seconds": percentile(latencies, 99),
+        "per_hour": analyses / (span / 3600) if span > 0 else float(analyses),
+        "bytes_saved": sum(r.get("bytes_saved") or 0 for r in records),
+    }
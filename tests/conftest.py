@@ -0,0 +1,108 @@
+import os
+import sys
+
+import pytest
+
+# The app is a set of top-level modules, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# How Gemini tends to write the markdown format: labels in bold, with the
+# colon inside or outside the markers
+BOLD_REPORT = """\
+# Brand & Product Mapping
+
+A. Naga Brand Products
+- **Rava**
+- **Maida**
+
+B. Competitor Brands Mentioned
+- **Aachi:** Sambar powder, Rava
+
+------------------------------------------------------------
+
+# 2. Sales Matrix
+
+**Naga Products Performance**
+- **Naga products promoted:** Rava (Accepted) - Agreed to order
+- **Schemes offered:** Rava: 1 free Maida with every 10 Rava; Bulk discount on Maida
+
+------------------------------------------------------------
+
+# 4. Competitive Intelligence & Customer Psychology
+
+A. Competitor Brand Analysis
+
+**Brand 1:**
+- **Brand Name:** Aachi
+- **Products:** Sambar powder, Rava
+- **Customer's Current Status:** Stocks Aachi regularly
+- **Reasons for Preference:** Cheaper per kg
+- **Category:** Price Concern
+
+B. Online Retailers Mentioned
+- None mentioned
+
+------------------------------------------------------------
+
+# 5. Salesperson Effectiveness Score
+
+**Product promotion (30% weight):** 8/10
+**Scheme leverage (20% weight):** 7/10
+**Competitor handling (25% weight):** N/A (10)/10
+**Customer psychology understanding (25% weight):** 6/10
+
+------------------------------------------------------------
+
+# 7. Product Price Analysis
+- **Rava**: Customer felt the price is higher than Aachi
+"""
+
+
+@pytest.fixture
+def bold_report():
+    return BOLD_REPORT
+
+
+@pytest.fixture
+def sample_report():
+    # A structured report touching every section; built per test, so tests
+    # may change it
+    return {
+        "naga_products": ["Rava", "Maida"],
+        "competitor_brands": [{"brand": "Aachi", "products": ["Sambar powder"]}],
+        "conversation_summary": ["Pitched Rava and Maida."],
+        "products_promoted": [
+            {"product": "Rava", "customer_response": "Agreed to order", "outcome": "Accepted"},
+            {"product": "Maida", "customer_response": "Enough stock", "outcome": "Rejected"},
+        ],
+        "volume_upselling": "",
+        "schemes": [{"product": "Rava", "description": "1 free Maida with every 10 Rava"}],
+        "cross_selling": "",
+        "objections": ["Price Concern on Rava"],
+        "competitor_advantages": ["Aachi is cheaper"],
+        "regular_buying_products": ["Rava"],
+        "scheme_based_products": [],
+        "competitors": [{
+            "brand": "Aachi",
+            "products": ["Sambar powder"],
+            "current_status": "Stocks Aachi regularly",
+            "reasons": "Cheaper per kg",
+            "category": "Price Concern",
+        }],
+        "online_retailers": [],
+        "buying_psychology": {
+            "purchase_drivers": ["Margin"],
+            "risk_tolerance": "Low",
+            "stock_rotation": "Fast movers",
+            "openness_to_switching": "Open",
+            "buying_behaviour": "Buys on schemes",
+        },
+        "scores": {
+            "product_promotion": 8, "scheme_leverage": 7, "competitor_handling": None, "customer_psychology": 6,
+        },
+        "ability_analysis": "Handled the price objection with a scheme.",
+        "price_concerns": [{"product": "Rava", "price_point": "1 kg", "concern": "Higher than Aachi"}],
+        "strengths": ["Clear"],
+        "improvements": ["Quote numbers"],
+    }
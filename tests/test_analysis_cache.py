@@ -0,0 +1,65 @@
+import os
+
+from analysis_cache import AnalysisCache, make_cache_key
+
+
+def test_get_and_stats(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=10_000)
+    cache.put("a" * 64, "report", "model-x")
+
+    assert cache.get("a" * 64) == "report"
+    assert cache.get("b" * 64) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_get_any_counts_one_lookup(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    cache.put("b" * 64, "report", recording_id=3)
+
+    key, entry = cache.get_any(["a" * 64, "b" * 64])
+    assert key == "b" * 64
+    assert (entry["text"], entry["recording_id"]) == ("report", 3)
+    assert cache.get_any(["c" * 64, "d" * 64]) == (None, None)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_size_accounting_matches_disk(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    for n in range(5):
+        cache.put(make_cache_key(b"audio", "prompt", f"model-{n}"), "x" * (100 * n))
+    # Replacing an entry doesn't count it twice
+    cache.put(make_cache_key(b"audio", "prompt", "model-0"), "y" * 50)
+
+    on_disk = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(tmp_path) for name in files
+    )
+    assert cache.stats()["size_bytes"] == on_disk
+    assert cache.stats()["entries"] == 5
+    # A new instance rebuilds the same totals from the files
+    assert AnalysisCache(str(tmp_path)).stats()["size_bytes"] == on_disk
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    keys = [make_cache_key(b"audio", "prompt", f"model-{n}") for n in range(3)]
+    cache = AnalysisCache(str(tmp_path), max_bytes=10_000)
+    for key in keys:
+        cache.put(key, "x" * 1000)
+    # Room for three entries: their sizes differ by a few bytes (timestamps)
+    cache.max_bytes = cache.stats()["size_bytes"] + 50
+
+    cache.get(keys[0])
+    cache.put(make_cache_key(b"audio", "prompt", "model-3"), "x" * 1000)
+
+    # keys[1] was used least recently; keys[0] was just read
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] <= cache.max_bytes
+
+
+def test_a_single_oversized_entry_is_kept(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=10)
+    cache.put("a" * 64, "x" * 1000)
+    assert cache.get("a" * 64) == "x" * 1000
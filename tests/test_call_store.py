@@ -0,0 +1,132 @@
+import datetime
+
+import pytest
+
+from call_store import CallStore
+from report_schema import parse_report_markdown
+
+
+@pytest.fixture
+def scored(sample_report):
+    def scored(product_promotion, scheme_leverage=None):
+        return dict(sample_report, scores={
+            "product_promotion": product_promotion, "scheme_leverage": scheme_leverage,
+            "competitor_handling": None, "customer_psychology": None,
+        })
+    return scored
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CallStore(str(tmp_path / "calls.sqlite3"))
+
+
+def rollups(store):
+    rows = store.query("SELECT * FROM rollups ORDER BY dimension, key")
+    return [
+        {key: round(value, 6) if isinstance(value, float) else value for key, value in row.items()}
+        for row in rows
+    ]
+
+
+def assert_rollups_consistent(store):
+    # What was maintained call by call equals a rebuild from the calls
+    maintained = rollups(store)
+    store.rebuild_rollups()
+    assert rollups(store) == maintained
+
+
+def test_kpis_and_salesperson_summary(store, scored):
+    store.add_call(scored(8, 6), "a", salesperson="Ravi", call_date="2026-03-02", duration_seconds=120)
+    store.add_call(scored(4), "b", salesperson="Ravi", call_date="2026-03-05")
+    store.add_call(scored(10, 10), "c", salesperson="Anu", call_date="2026-04-01", duration_seconds=60)
+
+    march = store.kpis(datetime.date(2026, 3, 1), datetime.date(2026, 3, 31))
+    assert march["calls"] == 2
+    assert march["total_seconds"] == 120
+    # Only the timed call counts towards the average duration
+    assert march["avg_seconds"] == 120
+    assert march["product_promotion"] == 6
+    assert march["scheme_leverage"] == 6
+    assert store.kpis(datetime.date(2026, 5, 1), datetime.date(2026, 5, 31)) is None
+    assert store.kpis()["calls"] == 3
+
+    summary = {row["salesperson"]: row for row in store.salesperson_summary()}
+    assert summary["Ravi"]["calls"] == 2
+    assert summary["Anu"]["calls"] == 1
+    assert summary["Anu"]["total_seconds"] == 60
+    assert store.periods() == ["2026-04", "2026-03"]
+    assert_rollups_consistent(store)
+
+
+def test_replacing_a_call_moves_its_contribution(store, scored):
+    store.add_call(scored(8), "a", salesperson="Ravi", call_date="2026-03-02", duration_seconds=100)
+    store.add_call(scored(4), "b", salesperson="Ravi", call_date="2026-03-02", duration_seconds=50)
+    # Re-analysis of "a": new score, salesperson and day
+    store.add_call(scored(2), "a", salesperson="Anu", call_date="2026-03-09", duration_seconds=30)
+
+    assert store.count_calls() == 2
+    assert store.kpis(datetime.date(2026, 3, 2), datetime.date(2026, 3, 2))["product_promotion"] == 4
+    summary = {row["salesperson"]: row for row in store.salesperson_summary()}
+    assert summary["Ravi"]["calls"] == 1
+    assert summary["Ravi"]["total_seconds"] == 50
+    assert summary["Anu"]["product_promotion"] == 2
+    assert_rollups_consistent(store)
+
+
+def test_deleting_calls_empties_their_rollups(store, scored):
+    store.add_call(scored(8), "a", salesperson="Ravi", call_date="2026-03-02")
+    store.add_call(scored(6), "b", salesperson="Anu", call_date="2026-03-03")
+    revision = store.revision()
+
+    assert store.delete_call("a") is True
+    assert store.delete_call("a") is False
+    assert store.revision() > revision
+    assert [row["salesperson"] for row in store.salesperson_summary()] == ["Anu"]
+    assert store.kpis(datetime.date(2026, 3, 2), datetime.date(2026, 3, 2)) is None
+    assert store.query("SELECT COUNT(*) AS n FROM call_competitors")[0]["n"] == 1
+
+    store.delete_call("b")
+    assert store.count_calls() == 0
+    assert rollups(store) == []
+    assert store.date_bounds() == (None, None)
+
+
+def test_unscored_report_gets_no_final_score(store, scored):
+    call_id = store.add_call(scored(None), "a", call_date="2026-03-02")
+    assert store.query("SELECT final_score FROM calls WHERE id = ?", (call_id,))[0]["final_score"] is None
+    kpis = store.kpis()
+    assert kpis["calls"] == 1
+    assert kpis["avg_score"] is None
+
+
+def test_bolded_markdown_report_stores_one_competitor(store, bold_report):
+    report = parse_report_markdown(bold_report)
+    call_id = store.add_call(report, "a", report_markdown=bold_report, call_date="2026-03-02")
+
+    competitors = store.query("SELECT brand, category FROM call_competitors WHERE call_id = ?", (call_id,))
+    assert competitors == [{"brand": "Aachi", "category": "Price Concern"}]
+    assert sorted(row["product"] for row in store.competitor_reasons()) == ["Rava", "Sambar powder"]
+    assert sorted(store.mention_counts("Products Discussed")) == [("Maida", 1), ("Rava", 1)]
+    assert store.query("SELECT product FROM call_schemes ORDER BY product") == [
+        {"product": ""}, {"product": "Rava"},
+    ]
+    assert store.query("SELECT product FROM call_price_concerns") == [{"product": "Rava"}]
+
+
+def test_search_by_section_ignores_headings(store, bold_report):
+    store.add_call(parse_report_markdown(bold_report), "a", report_markdown=bold_report, call_date="2026-03-02")
+
+    assert store.search_reports("aachi cheaper", ["competitors"])[0] == 1
+    assert store.search_reports("aachi cheaper", ["prices"])[0] == 0
+    # "Analysis" is only in the section's heading ("Product Price Analysis")
+    assert store.search_reports("analysis", ["prices"])[0] == 0
+    assert store.search_reports("pricing", ["prices"])[0] == 1
+    total, matches = store.search_reports('"free maida"')
+    assert total == 1
+    assert "**" in matches[0]["snippet"]
+    # The rules between sections aren't part of any section's text
+    assert "---" not in store.search_reports("discount")[1][0]["snippet"]
+
+    store.delete_call("a")
+    assert store.search_reports("aachi")[0] == 0
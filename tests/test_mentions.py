@@ -0,0 +1,82 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from mentions import categorize_scores, count_mentions, total_mentions
+
+
+# The per-row loops the dashboards used before mentions.py, kept as the
+# reference the vectorized versions must match
+def loop_mentions(values, column="Mentions"):
+    tokens = []
+    for _, row in pd.DataFrame({column: pd.Series(values, dtype=object)}).iterrows():
+        tokens.extend(token.strip() for token in str(row[column]).split(",") if token.strip())
+    return tokens
+
+
+def loop_counts(values, label):
+    counts = Counter(loop_mentions(values))
+    freq_df = pd.DataFrame(counts.items(), columns=[label, 'Count'])
+    # Stable, so ties keep first-mention order (Counter keeps insertion order)
+    return freq_df.sort_values(by='Count', ascending=False, kind="stable")
+
+
+def loop_category(score):
+    if score > 8:
+        return 'Well'
+    elif 6 <= score <= 8:
+        return 'Moderate'
+    else:
+        return 'Poor'
+
+
+def rows(df):
+    return list(df.itertuples(index=False, name=None))
+
+
+CELLS = [
+    "Rava, Maida", "Maida", np.nan, "", " , ,", "Rava,,Atta ", None, "Atta, Rava", "Maida", "nan", " Sooji ",
+]
+
+
+def test_counts_match_the_row_loop():
+    assert rows(count_mentions(CELLS, "Product")) == rows(loop_counts(CELLS, "Product"))
+    assert total_mentions(CELLS) == len(loop_mentions(CELLS))
+
+
+def test_blank_and_missing_cells():
+    counts = dict(rows(count_mentions(CELLS)))
+    # Missing cells count as "nan" / "None", as str() of the cell always did
+    assert counts["nan"] == 2
+    assert counts["None"] == 1
+    assert "" not in counts
+    assert count_mentions([]).empty
+    assert total_mentions([" , ", ""]) == 0
+
+
+def test_ties_keep_first_mention_order():
+    values = ["Sooji", "Atta, Rava", "Rava, Sooji", "Maida", "Atta"]
+    assert rows(count_mentions(values, "Product")) == [
+        ("Sooji", 2), ("Atta", 2), ("Rava", 2), ("Maida", 1),
+    ]
+
+
+def test_randomized_cells_match_the_row_loop():
+    rng = random.Random(7)
+    words = ["Rava", "Maida", "Atta", " Sooji", "Aachi ", "", " "]
+    values = [
+        np.nan if rng.random() < 0.1 else ",".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        for _ in range(500)
+    ]
+    assert rows(count_mentions(values, "Mention")) == rows(loop_counts(values, "Mention"))
+    assert total_mentions(values) == len(loop_mentions(values))
+
+
+def test_categorize_scores_matches_the_row_loop():
+    scores = pd.Series([10, 9, 8.5, 8.01, 8, 7, 6, 5.99, 0, np.nan])
+    expected = scores.apply(loop_category)
+    assert categorize_scores(scores).tolist() == expected.tolist()
+    # Not numbers at all: Poor, where the loop would have raised
+    assert categorize_scores(["n/a", None]).tolist() == ['Poor', 'Poor']
@@ -0,0 +1,25 @@
+from model_router import missing_sections
+from report_schema import parse_report_markdown, render_report_markdown
+
+
+def test_rendered_report_has_every_section(sample_report):
+    assert missing_sections(render_report_markdown(sample_report)) == []
+
+
+def test_bold_and_nested_headings_count():
+    text = "\n".join(f"{'#' * (1 + n % 2)} **{n}. Section {n}**\n- text" for n in range(1, 10))
+    assert missing_sections(text) == []
+
+
+def test_missing_and_look_alike_headings():
+    text = "# 1. Summary\n# 10. Extra\n- # 2. not a heading\n" + "\n".join(f"# {n}. S" for n in range(3, 10))
+    assert missing_sections(text) == ["# 2."]
+
+
+def test_bold_headings_still_parse(sample_report):
+    text = render_report_markdown(sample_report)
+    for number in range(1, 10):
+        text = text.replace(f"# {number}. ", f"## **{number}. ")
+    parsed = parse_report_markdown(text)
+    assert parsed["competitors"][0]["brand"] == "Aachi"
+    assert parsed["scores"]["product_promotion"] == 8.0
@@ -0,0 +1,49 @@
+from report_schema import final_score, parse_report_markdown, render_report_markdown
+
+
+def test_parse_rendered_report_round_trips(sample_report):
+    parsed = parse_report_markdown(render_report_markdown(sample_report))
+
+    assert parsed["naga_products"] == ["Rava", "Maida"]
+    assert parsed["competitor_brands"] == [{"brand": "Aachi", "products": ["Sambar powder"]}]
+    assert [(c["brand"], c["products"], c["category"]) for c in parsed["competitors"]] == [
+        ("Aachi", ["Sambar powder"], "Price Concern"),
+    ]
+    assert parsed["schemes"] == [{"product": "Rava", "description": "1 free Maida with every 10 Rava"}]
+    assert [c["product"] for c in parsed["price_concerns"]] == ["Rava"]
+    assert parsed["scores"] == {k: (None if v is None else float(v)) for k, v in sample_report["scores"].items()}
+
+
+def test_parse_bolded_labels(bold_report):
+    parsed = parse_report_markdown(bold_report)
+
+    assert parsed["naga_products"] == ["Rava", "Maida"]
+    assert parsed["competitor_brands"] == [{"brand": "Aachi", "products": ["Sambar powder", "Rava"]}]
+    competitor = parsed["competitors"][0]
+    assert competitor["brand"] == "Aachi"
+    assert competitor["products"] == ["Sambar powder", "Rava"]
+    assert competitor["current_status"] == "Stocks Aachi regularly"
+    assert competitor["reasons"] == "Cheaper per kg"
+    assert competitor["category"] == "Price Concern"
+    assert parsed["schemes"] == [
+        {"product": "Rava", "description": "1 free Maida with every 10 Rava"},
+        {"product": "", "description": "Bulk discount on Maida"},
+    ]
+    assert [c["product"] for c in parsed["price_concerns"]] == ["Rava"]
+    assert parsed["scores"] == {
+        "product_promotion": 8.0, "scheme_leverage": 7.0, "competitor_handling": None, "customer_psychology": 6.0,
+    }
+
+
+def test_parse_missing_sections_come_back_empty():
+    parsed = parse_report_markdown("# 1. Conversation Summary\n- Nothing useful\n")
+
+    assert parsed["naga_products"] == []
+    assert parsed["competitors"] == []
+    assert parsed["schemes"] == []
+    assert all(score is None for score in parsed["scores"].values())
+
+
+def test_final_score_counts_na_as_full_marks():
+    scores = {"product_promotion": 8, "scheme_leverage": 7, "competitor_handling": None, "customer_psychology": 6}
+    assert final_score(scores) == round(8 * 0.3 + 7 * 0.2 + 10 * 0.25 + 6 * 0.25, 2)
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from backends import BackendError
+from resilience import CircuitBreaker, CircuitOpenError, ResilientBackend, RetryPolicy
+
+
+def open_breaker(reset_timeout=0.05):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_open_breaker_fails_fast():
+    breaker = open_breaker(reset_timeout=60)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_trial_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_trial_frees_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.release_trial()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+class SlowBackend:
+    name = "slow"
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_text(self, prompt, model_name=None, response_schema=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.2)
+        raise BackendError("still down", status_code=503)
+
+
+def test_concurrent_callers_send_one_trial():
+    backend = SlowBackend()
+    resilient = ResilientBackend(
+        backend, policy=RetryPolicy(max_attempts=1, timeout=5, hedge_after=None), breaker=open_breaker(),
+    )
+    time.sleep(0.06)
+    errors = []
+
+    def call():
+        try:
+            resilient.generate_text("prompt")
+        except BackendError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.calls == 1
+    assert sum(isinstance(e, CircuitOpenError) for e in errors) == 7
@@ -0,0 +1,32 @@
+from segmented_analysis import PAUSE_SEARCH_SECONDS, plan_segments
+
+
+def test_short_call_is_one_segment():
+    assert plan_segments(300, [], segment_seconds=300, overlap=15) == [(0.0, 300)]
+    # Up to a quarter longer than a segment still isn't split
+    assert plan_segments(375, [], segment_seconds=300, overlap=15) == [(0.0, 375)]
+
+
+def test_segments_cover_the_call_with_overlap():
+    segments = plan_segments(900, [], segment_seconds=300, overlap=15)
+
+    assert segments == [(0.0, 315), (285, 615), (585, 900)]
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end - start == 30
+
+
+def test_cuts_move_to_the_nearest_pause():
+    pauses = [(250, 252), (318, 322), (700, 702)]
+    segments = plan_segments(900, pauses, segment_seconds=300, overlap=15)
+
+    # 320 is closer to the ideal cut at 300 than 251; the next ideal is 620,
+    # and the pause at 701 is out of reach
+    assert 620 + PAUSE_SEARCH_SECONDS < 701
+    assert segments == [(0.0, 335), (305, 635), (605, 900)]
+
+
+def test_pause_inside_the_overlap_is_not_used():
+    # A cut this close to the segment start would make an empty segment
+    segments = plan_segments(800, [(10, 12)], segment_seconds=20, overlap=15)
+    assert all(end > start for start, end in segments)
+    assert segments[0] == (0.0, 35)